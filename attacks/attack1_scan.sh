@@ -1,2 +1,11 @@
 #!/usr/bin/env bash
-echo "[attack1] placeholder for nmap scan in your lab"
+# Offline port scan: writes a pcap of background traffic with a SYN sweep
+# mixed in (plus scan.truth.json). Nothing is sent on the network.
+#   attacks/attack1_scan.sh [out.pcap] [--rate PROBES_PER_S] [--ports N] ...
+set -euo pipefail
+OUT="data/attacks/scan.pcap"
+if [[ $# -gt 0 && "$1" != -* ]]; then
+  OUT="$1"
+  shift
+fi
+exec python "$(dirname "$0")/generate.py" scan --out "$OUT" "$@"
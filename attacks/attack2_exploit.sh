@@ -1,2 +1,11 @@
 #!/usr/bin/env bash
-echo "[attack2] placeholder for exploit demo"
+# Offline exploit + reverse shell: writes a pcap of background traffic with
+# the attack mixed in (plus exploit.truth.json). Nothing is sent on the network.
+#   attacks/attack2_exploit.sh [out.pcap] [--rate ATTEMPTS_PER_S] [--attempts N] ...
+set -euo pipefail
+OUT="data/attacks/exploit.pcap"
+if [[ $# -gt 0 && "$1" != -* ]]; then
+  OUT="$1"
+  shift
+fi
+exec python "$(dirname "$0")/generate.py" exploit --out "$OUT" "$@"
@@ -1,2 +1,19 @@
 #!/usr/bin/env python3
-print('[attack3] placeholder for exfiltration demo')
+"""
+Offline exfiltration: writes a pcap of background traffic with a bulk
+upload to an external host mixed in (plus exfil.truth.json). Nothing is
+sent on the network.
+
+  python attacks/attack3_exfiltrate.py [out.pcap] [--rate BYTES_PER_S] [--bytes N] ...
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generate import main  # noqa: E402
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    out = args.pop(0) if args and not args[0].startswith("-") else "data/attacks/exfil.pcap"
+    main(["exfil", "--out", out] + args)
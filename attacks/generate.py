@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Offline attack traffic: writes a pcap of synthetic background traffic with
+one or more attacks mixed in, plus a ground-truth file for
+benchmarks/time_to_detect.py. Nothing is sent on the network.
+
+  python attacks/generate.py scan --rate 200 --out data/attacks/scan.pcap
+  python attacks/generate.py exploit --attempts 30 --out data/attacks/exploit.pcap
+  python attacks/generate.py exfil --bytes 50m --rate 2m --out data/attacks/exfil.pcap
+
+The ground truth goes next to the pcap as <name>.truth.json: per attack, the
+attacker-side addresses (outside every background pool) and the first and
+last packet times. The wrappers attack1_scan.sh, attack2_exploit.sh and
+attack3_exfiltrate.py call this with one attack each.
+"""
+import argparse
+import heapq
+import json
+import random
+import socket
+import sys
+from itertools import takewhile
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from benchmarks.synth import (  # noqa: E402
+    ACK, BASE_TS, MSS, PSH, RST, SYN, Hosts, Payloads, PcapWriter, generate_packets,
+    parse_count, parse_mix, tcp_frame, tcp_handshake, tcp_teardown,
+)
+
+# background without the synthetic scan profile, so the only scanner is ours
+BACKGROUND_MIX = "web=0.6,dns=0.35,bulk=0.05"
+
+SCANNER = "198.51.100.7"
+EXPLOITER = "198.51.100.23"
+EXFIL_SINK = "203.0.113.50"
+
+
+def parse_rate(text: str) -> float:
+    """Like parse_count but keeps fractions: '0.5', '200', '2m'."""
+    text = text.strip().lower()
+    mult = {"k": 1e3, "m": 1e6, "g": 1e9}.get(text[-1:], 1)
+    return float(text[:-1] if mult > 1 else text) * mult
+
+
+def _addr(a: str) -> bytes:
+    return socket.inet_aton(a)
+
+
+def attack_scan(rng, start, hosts, payloads, rate, args):
+    """SYN sweep of --ports ports on one server at `rate` probes/s."""
+    a, victim = _addr(SCANNER), hosts.servers[0]
+    ports = list(range(1, args.ports + 1))
+    rng.shuffle(ports)
+    open_ports = {22, 80, 443}
+    pkts = []
+    for i, dport in enumerate(ports):
+        t = start + i / rate
+        sport = rng.randint(32768, 60999)
+        rtt = rng.uniform(0.0005, 0.005)
+        pkts.append((t, tcp_frame(a, victim[1], sport, dport, SYN)))
+        if dport in open_ports:
+            pkts.append((t + rtt, tcp_frame(victim[1], a, dport, sport, SYN | ACK)))
+            pkts.append((t + 1.5 * rtt, tcp_frame(a, victim[1], sport, dport, RST)))
+        else:
+            pkts.append((t + rtt, tcp_frame(victim[1], a, dport, sport, RST | ACK)))
+    return pkts, [SCANNER], [victim[0]]
+
+
+def attack_exploit(rng, start, hosts, payloads, rate, args):
+    """
+    --attempts exploit deliveries to --port at `rate` per second
+    (high-entropy payloads), then a reverse shell from the victim back to the
+    attacker that stays interactive for --shell-seconds.
+    """
+    a, victim = _addr(EXPLOITER), hosts.servers[1]
+    v = victim[1]
+    pkts = []
+    t = start
+    for _ in range(args.attempts):
+        sport = rng.randint(32768, 60999)
+        session, t1, rtt = tcp_handshake(rng, t, a, v, sport, args.port)
+        session.append((t1, tcp_frame(a, v, sport, args.port, PSH | ACK, payloads.get(rng.randint(900, MSS), True))))
+        session.append((t1 + rtt, tcp_frame(v, a, args.port, sport, PSH | ACK, payloads.get(rng.randint(40, 120), False))))
+        pkts += session + tcp_teardown(rng, t1 + 2 * rtt, a, v, sport, args.port, rtt)
+        t += 1 / rate
+
+    # reverse shell: victim -> attacker:4444, small keystroke/output packets
+    sport = rng.randint(32768, 60999)
+    session, t, rtt = tcp_handshake(rng, t, v, a, sport, 4444)
+    end = t + args.shell_seconds
+    while t < end:
+        t += rng.expovariate(1 / 0.5)
+        session.append((t, tcp_frame(a, v, 4444, sport, PSH | ACK, payloads.get(rng.randint(4, 40), False))))
+        session.append((t + rtt, tcp_frame(v, a, sport, 4444, PSH | ACK, payloads.get(rng.randint(20, 600), False))))
+    pkts += session + tcp_teardown(rng, t + rtt, v, a, sport, 4444, rtt)
+    return pkts, [EXPLOITER], [victim[0]]
+
+
+def attack_exfil(rng, start, hosts, payloads, rate, args):
+    """One internal client uploads --bytes of high-entropy data over 443 at `rate` bytes/s."""
+    c, sink = hosts.clients[0], _addr(EXFIL_SINK)
+    sport = rng.randint(32768, 60999)
+    pkts, t, rtt = tcp_handshake(rng, start, c[1], sink, sport, 443)
+    gap = MSS / rate
+    for i in range(max(args.bytes // MSS, 1)):
+        t += gap
+        pkts.append((t, tcp_frame(c[1], sink, sport, 443, ACK, payloads.get(MSS, True))))
+        if i % 2:
+            pkts.append((t + rtt / 2, tcp_frame(sink, c[1], 443, sport, ACK)))
+    pkts += tcp_teardown(rng, t + rtt, c[1], sink, sport, 443, rtt)
+    return pkts, [EXFIL_SINK], [c[0]]
+
+
+ATTACKS = {
+    "scan": attack_scan,
+    "exploit": attack_exploit,
+    "exfil": attack_exfil,
+}
+DEFAULT_RATES = {"scan": 200, "exploit": 2, "exfil": parse_count("2m")}
+
+
+def write_attack_pcap(out: Path, attacks: list, args) -> dict:
+    """Merge background and attack packets by timestamp into `out`; returns the truth record."""
+    rng = random.Random(args.seed + 1)
+    hosts = Hosts(random.Random(args.seed))  # same pools the background draws from
+    payloads = Payloads(rng)
+    start = BASE_TS + args.start
+
+    streams, truth = [], {"pcap": out.name, "seed": args.seed, "attacks": []}
+    for name in attacks:
+        rate = args.rate if args.rate is not None else DEFAULT_RATES[name]
+        pkts, attackers, victims = ATTACKS[name](rng, start, hosts, payloads, rate, args)
+        pkts.sort(key=lambda p: p[0])
+        streams.append(pkts)
+        truth["attacks"].append({
+            "name": name,
+            "hosts": attackers,
+            "victims": victims,
+            "start": pkts[0][0],
+            "end": pkts[-1][0],
+            "packets": len(pkts),
+        })
+
+    end = BASE_TS + args.duration
+    background = takewhile(
+        lambda p: p[0] < end,
+        generate_packets(float("inf"), parse_mix(args.mix), args.seed, args.background_rate),
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with PcapWriter(out) as w:
+        for ts, frame in heapq.merge(background, *streams, key=lambda p: p[0]):
+            w.write(ts, frame)
+        truth["packets"] = w.packets
+    truth["background"] = {"mix": args.mix, "rate": args.background_rate, "duration_s": args.duration}
+    return truth
+
+
+def truth_path(pcap: Path) -> Path:
+    return pcap.with_name(pcap.stem + ".truth.json")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Write background traffic with attacks mixed in to a pcap")
+    ap.add_argument("attacks", nargs="+", choices=list(ATTACKS), help="Attacks to mix in")
+    ap.add_argument("--out", required=True, help="Output pcap; ground truth goes next to it")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--duration", type=float, default=120.0, help="Seconds of background traffic")
+    ap.add_argument("--start", type=float, default=60.0, help="Seconds into the capture the attacks begin")
+    ap.add_argument("--background-rate", type=float, default=20.0, help="Background conversations per second")
+    ap.add_argument("--mix", default=BACKGROUND_MIX, help="Background flow mix (see benchmarks/synth.py)")
+    ap.add_argument("--rate", type=parse_rate, default=None,
+                    help="Attack rate: probes/s (scan, 200), attempts/s (exploit, 2), bytes/s (exfil, 2m)")
+    scan = ap.add_argument_group("scan")
+    scan.add_argument("--ports", type=int, default=1024, help="Ports swept")
+    exploit = ap.add_argument_group("exploit")
+    exploit.add_argument("--attempts", type=int, default=20, help="Exploit deliveries before the shell")
+    exploit.add_argument("--port", type=int, default=8080, help="Targeted service port")
+    exploit.add_argument("--shell-seconds", type=float, default=30.0, help="How long the reverse shell stays active")
+    exfil = ap.add_argument_group("exfil")
+    exfil.add_argument("--bytes", type=parse_count, default=parse_count("20m"), help="Bytes uploaded")
+    return ap
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    if args.rate is not None:
+        if args.rate <= 0:
+            raise SystemExit("[err] --rate must be positive")
+        if len(set(args.attacks)) > 1:
+            raise SystemExit("[err] --rate has a different unit per attack; give it with a single attack")
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        raise SystemExit(f"[err] {e}")
+
+    out = Path(args.out)
+    truth = write_attack_pcap(out, args.attacks, args)
+    truth_path(out).write_text(json.dumps(truth, indent=2))
+    for a in truth["attacks"]:
+        print(f"[ok] {a['name']}: {a['packets']} packets from t+{a['start'] - BASE_TS:.1f}s to t+{a['end'] - BASE_TS:.1f}s")
+    print(f"[ok] wrote {truth['packets']} packets to {out} (truth in {truth_path(out)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: how long each entry point takes to import, measured with
+`python -X importtime`, checked against a budget.
+
+Two things are enforced per entry point:
+  - cumulative import time (best of --repeat runs) stays under budget_ms
+  - none of the listed heavy packages get imported at module load
+
+  python benchmarks/import_time.py            # report
+  python benchmarks/import_time.py --check    # exit 1 on any regression
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+
+HEAVY = ["scapy", "sklearn", "matplotlib", "pandas", "joblib"]
+
+# module, budget (ms), heavy packages it must not import at load time
+BUDGETS = [
+    ("dashboard.app", 350, HEAVY),
+    ("feature_extractor.extract", 600, ["scapy", "sklearn", "matplotlib", "joblib"]),
+    ("models.train", 600, ["scapy", "sklearn", "matplotlib", "joblib"]),
+    ("models.score", 700, ["scapy", "sklearn", "matplotlib", "joblib"]),
+    ("pipeline", 800, ["scapy", "sklearn", "matplotlib", "joblib"]),
+    ("sensors.wire", 50, HEAVY),
+]
+
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(module: str, cwd: str) -> tuple:
+    """Return (cumulative microseconds for `module`, set of top-level packages imported)."""
+    env = dict(os.environ, PYTHONPATH=str(REPO))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    total = None
+    packages = set()
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if not m:
+            continue
+        name = m.group(4)
+        packages.add(name.split(".")[0])
+        if name == module:
+            total = int(m.group(2))
+    return total or 0, packages
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Import-time budget for the pipeline entry points")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per module; the best is kept")
+    ap.add_argument("--check", action="store_true", help="Exit 1 if any budget is exceeded")
+    args = ap.parse_args()
+
+    failures = []
+    # dashboard.app creates data/ and models/ in the cwd; keep that out of the repo
+    with tempfile.TemporaryDirectory() as cwd:
+        print(f"{'module':<28} {'import ms':>10} {'budget':>8}  heavy imports")
+        for module, budget_ms, forbidden in BUDGETS:
+            runs = [measure(module, cwd) for _ in range(args.repeat)]
+            best_ms = min(us for us, _ in runs) / 1000
+            loaded = sorted(set(forbidden) & runs[0][1])
+            flag = "" if best_ms <= budget_ms and not loaded else "  <-- over budget"
+            print(f"{module:<28} {best_ms:>10.1f} {budget_ms:>8}  {', '.join(loaded) or '-'}{flag}")
+            if best_ms > budget_ms:
+                failures.append(f"{module}: {best_ms:.1f} ms > {budget_ms} ms")
+            if loaded:
+                failures.append(f"{module}: imports {', '.join(loaded)} at load time")
+
+    if failures:
+        print("\n".join(["", "[err] startup budget exceeded:"] + failures))
+        if args.check:
+            raise SystemExit(1)
+    else:
+        print("[ok] all entry points within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Dashboard load test: drives /anomalies, /stats and /download_anomalies with
+concurrent clients and reports p50/p99 latency and requests/s per endpoint.
+
+By default it builds a synthetic scored dataset (--flows, 1M rows) in --dir
+once, starts `dashboard.serve` there for each --workers count in turn, and
+compares them. Pass --url to test a server that is already running instead.
+
+  python benchmarks/load_test.py --flows 1m --workers 1,4 --duration 30
+  python benchmarks/load_test.py --url http://127.0.0.1:5000 --concurrency 64 --out load.json
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from benchmarks.synth import DEFAULT_MIX, parse_count, parse_mix  # noqa: E402
+
+# path -> weight; the query variants keep /anomalies from being one hot page
+DEFAULT_PATHS = "/anomalies=4,/anomalies?view=all=2,/anomalies?min_score=0.05=1,/stats=3,/download_anomalies=1"
+
+
+def parse_paths(text: str) -> list:
+    paths = []
+    for part in text.split(","):
+        path, _, weight = part.rpartition("=")
+        try:
+            weight = float(weight)
+        except ValueError:  # no weight; the '=' belonged to the query string
+            path, weight = part, 1.0
+        paths.append((path.strip() or part.strip(), weight))
+    return paths
+
+
+def prepare_data(root: Path, flows: int, seed: int) -> None:
+    """Write root/data/scored.csv and scored.db for `flows` synthetic flows (skipped if present)."""
+    data = root / "data"
+    marker = data / f".synth-{flows}-{seed}"
+    if marker.exists():
+        return
+    from benchmarks.synth import synth_flows
+    from feature_extractor.extract import add_host_features
+    from models.score import score_flows, write_flow_db
+    from models.train import train_model
+
+    print(f"[ok] building a scored dataset of {flows} flows in {data}")
+    data.mkdir(parents=True, exist_ok=True)
+    df = synth_flows(flows, parse_mix(DEFAULT_MIX), seed)
+    df, sketches = add_host_features(df)
+    scored = score_flows(df, train_model(df))
+    scored.to_csv(data / "scored.csv", index=False)
+    write_flow_db(scored, data / "scored.db")
+    (data / "host_sketches.json").write_text(json.dumps(sketches.summary()))
+    for old in data.glob(".synth-*"):
+        old.unlink()
+    marker.touch()
+
+
+# --- Client ----------------------------------------------------------------------
+
+def _client(host, port, paths, deadline, out, errors):
+    """One keep-alive connection issuing weighted-random requests until `deadline`."""
+    rng = random.Random(threading.get_ident())
+    choices, weights = zip(*paths)
+    conn = None
+    while time.monotonic() < deadline:
+        path = rng.choices(choices, weights)[0]
+        start = time.perf_counter()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            size = 0
+            while chunk := resp.read(1 << 16):
+                size += len(chunk)
+            if resp.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(f"{path}: {e!r}")
+            if conn is not None:
+                conn.close()
+            conn = None
+            continue
+        out.append((path, resp.status, time.perf_counter() - start, size))
+    if conn is not None:
+        conn.close()
+
+
+def _client_process(url, paths, duration, threads):
+    """Runs `threads` clients in one process; returns (samples, errors)."""
+    u = urllib.parse.urlsplit(url)
+    deadline = time.monotonic() + duration
+    samples, errors = [], []
+    pool = [
+        threading.Thread(target=_client, args=(u.hostname, u.port or 80, paths, deadline, samples, errors))
+        for _ in range(threads)
+    ]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return samples, errors
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def run_load(url: str, paths: list, duration: float, concurrency: int, processes: int) -> dict:
+    # client threads share a GIL, so spread them over processes to keep the
+    # load generator from being the bottleneck
+    processes = max(1, min(processes, concurrency))
+    per_proc = [concurrency // processes + (i < concurrency % processes) for i in range(processes)]
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        started = time.perf_counter()
+        parts = pool.starmap(_client_process, [(url, paths, duration, n) for n in per_proc])
+        elapsed = time.perf_counter() - started
+    samples = [s for part, _ in parts for s in part]
+    errors = [e for _, part in parts for e in part]
+
+    report = {"url": url, "duration_s": elapsed, "concurrency": concurrency, "errors": len(errors), "endpoints": {}}
+    for path, _ in paths:
+        mine = [s for s in samples if s[0] == path]
+        lat = sorted(s[2] for s in mine)
+        report["endpoints"][path] = {
+            "requests": len(mine),
+            "non_2xx": sum(1 for s in mine if not 200 <= s[1] < 300),
+            "req_per_s": len(mine) / elapsed,
+            "p50_ms": percentile(lat, 0.50) * 1000,
+            "p99_ms": percentile(lat, 0.99) * 1000,
+            "mean_kb": sum(s[3] for s in mine) / len(mine) / 1024 if mine else 0.0,
+        }
+    lat = sorted(s[2] for s in samples)
+    report["total"] = {
+        "requests": len(samples),
+        "req_per_s": len(samples) / elapsed,
+        "p50_ms": percentile(lat, 0.50) * 1000,
+        "p99_ms": percentile(lat, 0.99) * 1000,
+    }
+    if errors:
+        report["first_errors"] = errors[:5]
+    return report
+
+
+def print_report(label: str, r: dict) -> None:
+    print(f"\n{label}: {r['total']['requests']} requests in {r['duration_s']:.1f}s, "
+          f"{r['total']['req_per_s']:.1f} req/s, {r['errors']} errors")
+    print(f"  {'endpoint':<34} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'non-2xx':>8} {'avg KB':>9}")
+    for path, e in r["endpoints"].items():
+        print(f"  {path:<34} {e['req_per_s']:>8.1f} {e['p50_ms']:>9.1f} {e['p99_ms']:>9.1f}"
+              f" {e['non_2xx']:>8} {e['mean_kb']:>9.1f}")
+    for err in r.get("first_errors", []):
+        print(f"  [warn] {err}")
+
+
+# --- Server under test -----------------------------------------------------------
+
+def start_server(root: Path, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, PYTHONPATH=str(REPO) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "dashboard.serve", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--watch", "0"],
+        cwd=root, env=env,
+    )
+    deadline = time.monotonic() + 300  # warm-up parses the whole dataset
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"[err] dashboard.serve exited with {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            conn.close()
+            return proc
+        except OSError:
+            time.sleep(0.5)
+    proc.terminate()
+    raise SystemExit("[err] dashboard.serve did not come up")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Load-test the dashboard")
+    ap.add_argument("--url", default="", help="Test this running server instead of starting one")
+    ap.add_argument("--flows", type=parse_count, default=parse_count("1m"), help="Rows in the synthetic scored dataset")
+    ap.add_argument("--dir", default=str(REPO / "data" / "loadtest"), help="Working directory for the served dataset")
+    ap.add_argument("--workers", default="1,4", help="Worker counts to compare (comma-separated)")
+    ap.add_argument("--port", type=int, default=5099)
+    ap.add_argument("--paths", default=DEFAULT_PATHS, help="path=weight list")
+    ap.add_argument("--duration", type=float, default=30.0, help="Seconds of load per run")
+    ap.add_argument("--warmup", type=float, default=3.0, help="Seconds of unrecorded load before each run")
+    ap.add_argument("--concurrency", type=int, default=32, help="Concurrent client connections")
+    ap.add_argument("--client-processes", type=int, default=os.cpu_count() or 1,
+                    help="Processes the clients are spread over")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="", help="Also write the results as JSON")
+    args = ap.parse_args()
+
+    paths = parse_paths(args.paths)
+    results = []
+
+    def measure(url, label):
+        if args.warmup > 0:
+            run_load(url, paths, args.warmup, args.concurrency, args.client_processes)
+        r = run_load(url, paths, args.duration, args.concurrency, args.client_processes)
+        r["label"] = label
+        print_report(label, r)
+        results.append(r)
+
+    if args.url:
+        measure(args.url, args.url)
+    else:
+        root = Path(args.dir)
+        prepare_data(root, args.flows, args.seed)
+        for workers in (int(w) for w in args.workers.split(",")):
+            proc = start_server(root, args.port, workers)
+            try:
+                measure(f"http://127.0.0.1:{args.port}", f"{workers} worker(s), {args.flows} flows")
+            finally:
+                proc.terminate()
+                proc.wait()
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(results, indent=2))
+        print(f"\n[ok] wrote results to {out}")
+
+
+if __name__ == "__main__":
+    main()
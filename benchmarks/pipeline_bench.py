@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the detection pipeline on synthetic traffic
+(benchmarks/synth.py), at several scales.
+
+Per scale (given in packets) three steps are timed, each in a fresh process
+so peak RSS is its own:
+  extract  extract_from_pcap() on a generated pcap (cached in --cache-dir)
+  train    train_model() on synthetic flow rows
+  score    score_flows() on the same rows, with a model fitted beforehand
+
+Train and score use synth_flows() sized to the number of flows that many
+packets produce with the chosen mix, so they can run at 10M+ packets without
+parsing a pcap that size; extraction above --extract-limit is skipped. The
+flow rows carry the base flow columns only.
+
+Results (seconds, packets/s, flows/s, peak RSS) go to a JSON file named after
+the current commit; --baseline compares against an earlier one:
+
+  python benchmarks/pipeline_bench.py
+  python benchmarks/pipeline_bench.py --scales 10k,1m,100m --extract-limit 1m
+  python benchmarks/pipeline_bench.py --baseline benchmarks/results/abc1234.json   # exit 1 on regression
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from benchmarks.synth import DEFAULT_MIX, parse_count, parse_mix, synth_flows, write_pcap  # noqa: E402
+
+RESULTS_DIR = REPO / "benchmarks" / "results"
+STEPS = ["extract", "train", "score"]
+NOISE_SECONDS = 0.05
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=REPO, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def cached_pcap(cache_dir: Path, packets: int, mix_text: str, mix: dict, seed: int) -> tuple:
+    """Generate the pcap once per (size, mix, seed); returns (path, manifest)."""
+    tag = f"{packets}-{seed}-" + "-".join(f"{k}{mix[k]:g}" for k in mix)
+    path = cache_dir / f"synth-{tag}.pcap"
+    manifest = path.with_suffix(".json")
+    if path.exists() and manifest.exists():
+        return path, json.loads(manifest.read_text())
+    print(f"[ok] generating {packets} packets ({mix_text}) -> {path}")
+    stats = write_pcap(path, packets, mix, seed)
+    manifest.write_text(json.dumps(stats))
+    return path, stats
+
+
+# --- Worker: one timed step in this process -------------------------------------
+
+def run_step(step: str, pcap: str, flows: int, mix: dict, seed: int, bidirectional: bool = False) -> dict:
+    from metrics import peak_rss_bytes
+
+    if step == "extract":
+        from feature_extractor.extract import extract_from_pcap
+
+        start = time.perf_counter()
+        df = extract_from_pcap(Path(pcap), bidirectional)
+        elapsed = time.perf_counter() - start
+        return {"seconds": elapsed, "flows": len(df), "peak_rss_bytes": peak_rss_bytes()}
+
+    from models.train import train_model
+
+    df = synth_flows(flows, mix, seed)
+    if step == "train":
+        setup_rss = peak_rss_bytes()
+        start = time.perf_counter()
+        train_model(df)
+    else:
+        from models.score import score_flows
+
+        model = train_model(df)
+        setup_rss = peak_rss_bytes()
+        start = time.perf_counter()
+        score_flows(df, model)
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "flows": len(df), "setup_peak_rss_bytes": setup_rss, "peak_rss_bytes": peak_rss_bytes()}
+
+
+def spawn_step(step: str, pcap: str, flows: int, args) -> dict:
+    cmd = [sys.executable, __file__, "--worker", step, "--pcap", pcap, "--flows", str(flows),
+           "--mix", args.mix, "--seed", str(args.seed)] + (["--bidirectional"] if args.bidirectional else [])
+    proc = subprocess.run(cmd, cwd=REPO, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"[err] {step} step failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# --- Comparison ------------------------------------------------------------------
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """Print per (scale, step) changes; return the rows slower than tolerance."""
+    base = {(r["scale_packets"], r["step"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nvs {baseline.get('commit') or 'baseline'}:")
+    print(f"{'scale':>12} {'step':<8} {'time':>8} {'peak rss':>9}")
+    for r in current["results"]:
+        old = base.get((r["scale_packets"], r["step"]))
+        if old is None:
+            continue
+        dt = r["seconds"] / old["seconds"] - 1 if old["seconds"] else 0.0
+        dm = r["peak_rss_bytes"] / old["peak_rss_bytes"] - 1 if old["peak_rss_bytes"] else 0.0
+        # sub-NOISE_SECONDS differences are timer jitter, whatever the ratio
+        slower = dt > tolerance and r["seconds"] - old["seconds"] > NOISE_SECONDS
+        flag = "  <-- slower" if slower else ""
+        print(f"{r['scale_packets']:>12} {r['step']:<8} {dt:+8.1%} {dm:+9.1%}{flag}")
+        if slower:
+            regressions.append(r)
+    return regressions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Time extract/train/score on synthetic traffic")
+    ap.add_argument("--scales", default="10k,100k,1m", help="Comma-separated packet counts (e.g. 10k,1m,100m)")
+    ap.add_argument("--steps", default=",".join(STEPS), help="Subset of extract,train,score")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="Flow mix, see benchmarks/synth.py")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--extract-limit", type=parse_count, default=parse_count("100k"),
+                    help="Skip extraction above this many packets (it holds the whole pcap in memory)")
+    ap.add_argument("--repeat", type=int, default=1, help="Runs per step; the fastest is kept")
+    ap.add_argument("--bidirectional", action="store_true", help="Extract one flow per conversation")
+    ap.add_argument("--cache-dir", default=str(REPO / "data" / "bench"), help="Where generated pcaps are kept")
+    ap.add_argument("--out", default="", help="Result JSON (default: benchmarks/results/<commit>.json)")
+    ap.add_argument("--baseline", default="", help="Earlier result JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown vs --baseline (0.10 = 10%%)")
+    ap.add_argument("--worker", choices=STEPS, help=argparse.SUPPRESS)
+    ap.add_argument("--pcap", default="", help=argparse.SUPPRESS)
+    ap.add_argument("--flows", type=int, default=0, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        raise SystemExit(f"[err] {e}")
+
+    if args.worker:
+        print(json.dumps(run_step(args.worker, args.pcap, args.flows, mix, args.seed, args.bidirectional)))
+        return
+
+    scales = sorted(parse_count(s) for s in args.scales.split(","))
+    steps = [s for s in STEPS if s in args.steps.split(",")]
+    cache_dir = Path(args.cache_dir)
+
+    # flows per packet for this mix, measured on the smallest pcap; sizes the
+    # train/score inputs at scales too big to generate. Each conversation is
+    # two directed flows, or one with --bidirectional.
+    _, manifest = cached_pcap(cache_dir, scales[0], args.mix, mix, args.seed)
+    per_conversation = 1 if args.bidirectional else 2
+    flows_per_packet = per_conversation * sum(manifest["conversations"].values()) / manifest["packets"]
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    dirty = bool(_git("status", "--porcelain", "--untracked-files=no"))
+    report = {
+        "commit": commit + ("-dirty" if dirty else ""),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mix": mix,
+        "seed": args.seed,
+        "flows_per_packet": flows_per_packet,
+        "bidirectional": args.bidirectional,
+        "results": [],
+    }
+
+    print(f"{'scale':>12} {'step':<8} {'seconds':>9} {'packets/s':>11} {'flows/s':>11} {'peak rss':>10}")
+    for packets in scales:
+        flows = max(int(packets * flows_per_packet), 1)
+        pcap = ""
+        for step in steps:
+            if step == "extract":
+                if packets > args.extract_limit:
+                    print(f"{packets:>12} {step:<8} skipped (over --extract-limit)")
+                    continue
+                pcap = str(cached_pcap(cache_dir, packets, args.mix, mix, args.seed)[0])
+            runs = [spawn_step(step, pcap, flows, args) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r["seconds"])
+            row = {
+                "scale_packets": packets,
+                "step": step,
+                **best,
+                "packets_per_sec": packets / best["seconds"] if step == "extract" else None,
+                "flows_per_sec": best["flows"] / best["seconds"],
+            }
+            report["results"].append(row)
+            pps = f"{row['packets_per_sec']:>11.0f}" if row["packets_per_sec"] else f"{'-':>11}"
+            print(f"{packets:>12} {step:<8} {row['seconds']:>9.3f} {pps} {row['flows_per_sec']:>11.0f}"
+                  f" {row['peak_rss_bytes'] / 2**20:>8.0f}MB")
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{report['commit'] or 'unknown'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"[ok] wrote results to {out}")
+
+    if args.baseline:
+        regressions = compare(json.loads(Path(args.baseline).read_text()), report, args.tolerance)
+        if regressions:
+            raise SystemExit(f"[err] {len(regressions)} step(s) slower than the baseline by more than {args.tolerance:.0%}")
+        print("[ok] no regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic traffic for benchmarks: the same seed, size and mix
+always produce byte-identical output.
+
+Two generators:
+  - write_pcap(): Ethernet/IPv4 packets streamed straight to a classic pcap,
+    so any size (10k .. 100M packets) is written in bounded memory. This is
+    what extract_from_pcap() gets benchmarked on.
+  - synth_flows(): flow rows shaped like extract_from_pcap() output, built
+    with numpy. Used to benchmark training and scoring at scales where parsing
+    a pcap that big is not practical.
+
+The flow mix is a comma-separated list of profile=weight (see PROFILES):
+
+  python benchmarks/synth.py --packets 1000000 --out data/bench/1m.pcap
+  python benchmarks/synth.py --packets 100k --mix web=0.5,dns=0.2,scan=0.3 --out scan_heavy.pcap
+  python benchmarks/synth.py --flows 1m --out data/bench/flows_1m.csv
+"""
+import argparse
+import heapq
+import json
+import random
+import socket
+import struct
+from bisect import bisect
+from itertools import accumulate
+from pathlib import Path
+
+BASE_TS = 1_700_000_000.0
+DEFAULT_MIX = "web=0.55,dns=0.3,bulk=0.05,scan=0.1"
+
+PCAP_HEADER = struct.Struct("<IHHiIII")
+PCAP_RECORD = struct.Struct("<IIII")
+ETH = bytes.fromhex("020000000002" "020000000001" "0800")
+IPV4 = struct.Struct("!BBHHHBBH4s4s")
+TCP_HDR = struct.Struct("!HHIIBBHHH")
+UDP_HDR = struct.Struct("!HHHH")
+
+FIN, SYN, RST, PSH, ACK = 0x01, 0x02, 0x04, 0x08, 0x10
+
+MSS = 1400
+
+
+def parse_count(text: str) -> int:
+    """'10k', '2.5m', '100M' or a plain integer."""
+    text = text.strip().lower().replace("_", "")
+    mult = {"k": 1_000, "m": 1_000_000, "g": 1_000_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if mult > 1 else text) * mult)
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in PROFILES:
+            raise ValueError(f"unknown flow profile {name!r} (have: {', '.join(PROFILES)})")
+        mix[name] = float(weight or 1.0)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("flow mix needs at least one profile with a positive weight")
+    return mix
+
+
+class Hosts:
+    """Fixed, seed-derived address pools (packed and dotted forms)."""
+
+    def __init__(self, rng: random.Random):
+        self.clients = self._pool(rng, "10.{}.{}.{}", 5000)
+        self.servers = self._pool(rng, "172.16.{}.{}", 200, octets=2)
+        self.resolvers = [("10.0.0.53", socket.inet_aton("10.0.0.53"))]
+        self.scanners = self._pool(rng, "192.168.66.{}", 4, octets=1)
+
+    @staticmethod
+    def _pool(rng, fmt, n, octets=3):
+        seen = {}
+        while len(seen) < n:
+            addr = fmt.format(*(rng.randint(1, 254) for _ in range(octets)))
+            seen.setdefault(addr, socket.inet_aton(addr))
+        return list(seen.items())
+
+
+class Payloads:
+    """Slices of two pre-generated blobs: text-like (low entropy) and compressed-like (high)."""
+
+    SIZE = 1 << 16
+
+    def __init__(self, rng: random.Random):
+        words = [b"GET", b"POST", b"HTTP/1.1", b"Host:", b"Accept:", b"text/html",
+                 b"cookie", b"session", b"user", b"id", b"json", b"200", b"OK"]
+        text = bytearray()
+        while len(text) < self.SIZE + MSS:
+            text += rng.choice(words) + b" "
+        self.text = bytes(text)
+        self.random = rng.randbytes(self.SIZE + MSS)
+        self.rng = rng
+
+    def get(self, n: int, high_entropy: bool) -> bytes:
+        blob = self.random if high_entropy else self.text
+        off = self.rng.randrange(self.SIZE)
+        return blob[off:off + n]
+
+
+def tcp_frame(src, dst, sport, dport, flags, payload=b"", seq=0, ack=0) -> bytes:
+    seg = TCP_HDR.pack(sport, dport, seq, ack, 5 << 4, flags, 65535, 0, 0) + payload
+    # checksums are left at zero: the extractor never verifies them
+    return ETH + IPV4.pack(0x45, 0, 20 + len(seg), 0, 0x4000, 64, 6, 0, src, dst) + seg
+
+
+def udp_frame(src, dst, sport, dport, payload) -> bytes:
+    dgram = UDP_HDR.pack(sport, dport, 8 + len(payload), 0) + payload
+    return ETH + IPV4.pack(0x45, 0, 20 + len(dgram), 0, 0x4000, 64, 17, 0, src, dst) + dgram
+
+
+# --- Flow profiles -------------------------------------------------------------
+# Each returns a list of (timestamp, frame) for one conversation starting at t.
+
+def tcp_handshake(rng, t, c, s, sport, dport):
+    rtt = rng.uniform(0.001, 0.05)
+    pkts = [
+        (t, tcp_frame(c, s, sport, dport, SYN)),
+        (t + rtt / 2, tcp_frame(s, c, dport, sport, SYN | ACK)),
+        (t + rtt, tcp_frame(c, s, sport, dport, ACK)),
+    ]
+    return pkts, t + rtt, rtt
+
+
+def tcp_teardown(rng, t, c, s, sport, dport, rtt):
+    return [
+        (t, tcp_frame(c, s, sport, dport, FIN | ACK)),
+        (t + rtt / 2, tcp_frame(s, c, dport, sport, FIN | ACK)),
+        (t + rtt, tcp_frame(c, s, sport, dport, ACK)),
+    ]
+
+
+def profile_web(rng, t, hosts, payloads):
+    c = rng.choice(hosts.clients)[1]
+    s = rng.choice(hosts.servers)[1]
+    sport, dport = rng.randint(32768, 60999), rng.choice((80, 443))
+    pkts, t, rtt = tcp_handshake(rng, t, c, s, sport, dport)
+    pkts.append((t, tcp_frame(c, s, sport, dport, PSH | ACK, payloads.get(rng.randint(200, 800), False))))
+    t += rtt
+    for _ in range(rng.randint(1, 12)):
+        t += rng.expovariate(1 / 0.002)
+        pkts.append((t, tcp_frame(s, c, dport, sport, ACK, payloads.get(MSS, dport == 443))))
+    return pkts + tcp_teardown(rng, t + rtt, c, s, sport, dport, rtt)
+
+
+def profile_dns(rng, t, hosts, payloads):
+    c = rng.choice(hosts.clients)[1]
+    r = hosts.resolvers[0][1]
+    sport = rng.randint(32768, 60999)
+    return [
+        (t, udp_frame(c, r, sport, 53, payloads.get(rng.randint(28, 60), False))),
+        (t + rng.uniform(0.0005, 0.03), udp_frame(r, c, 53, sport, payloads.get(rng.randint(60, 300), False))),
+    ]
+
+
+def profile_bulk(rng, t, hosts, payloads):
+    c = rng.choice(hosts.clients)[1]
+    s = rng.choice(hosts.servers)[1]
+    sport, dport = rng.randint(32768, 60999), rng.choice((22, 443, 873))
+    pkts, t, rtt = tcp_handshake(rng, t, c, s, sport, dport)
+    for i in range(rng.randint(50, 400)):
+        t += rng.expovariate(1 / 0.0005)
+        pkts.append((t, tcp_frame(s, c, dport, sport, ACK, payloads.get(MSS, True))))
+        if i % 2:
+            pkts.append((t, tcp_frame(c, s, sport, dport, ACK)))
+    return pkts + tcp_teardown(rng, t + rtt, c, s, sport, dport, rtt)
+
+
+def profile_scan(rng, t, hosts, payloads):
+    c = rng.choice(hosts.scanners)[1]
+    s = rng.choice(hosts.servers)[1]
+    sport, dport = rng.randint(32768, 60999), rng.randint(1, 1024)
+    rtt = rng.uniform(0.0005, 0.01)
+    pkts = [(t, tcp_frame(c, s, sport, dport, SYN))]
+    if rng.random() < 0.9:  # closed port
+        pkts.append((t + rtt, tcp_frame(s, c, dport, sport, RST | ACK)))
+    else:  # open: half-open scan resets it
+        pkts.append((t + rtt, tcp_frame(s, c, dport, sport, SYN | ACK)))
+        pkts.append((t + 1.5 * rtt, tcp_frame(c, s, sport, dport, RST)))
+    return pkts
+
+
+PROFILES = {
+    "web": profile_web,
+    "dns": profile_dns,
+    "bulk": profile_bulk,
+    "scan": profile_scan,
+}
+
+
+class PcapWriter:
+    """Classic little-endian pcap (microsecond timestamps, Ethernet link type)."""
+
+    def __init__(self, path: Path):
+        self.f = open(path, "wb", buffering=1 << 20)
+        self.f.write(PCAP_HEADER.pack(0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        self.packets = 0
+        self.bytes = 0
+
+    def write(self, ts: float, frame: bytes) -> None:
+        sec = int(ts)
+        self.f.write(PCAP_RECORD.pack(sec, int((ts - sec) * 1e6), len(frame), len(frame)))
+        self.f.write(frame)
+        self.packets += 1
+        self.bytes += len(frame)
+
+    def close(self) -> None:
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def generate_packets(packets: int, mix: dict, seed: int = 0, flows_per_sec: float = 2000.0,
+                     start: float = BASE_TS, stats: dict = None):
+    """
+    Yield (timestamp, frame) in timestamp order until `packets` have been
+    produced. Conversations start as a Poisson process; their packets are
+    merged through a heap that only holds conversations still in progress.
+    If given, `stats` is filled in with the conversation count per profile.
+    """
+    rng = random.Random(seed)
+    hosts = Hosts(rng)
+    payloads = Payloads(rng)
+    names = list(mix)
+    cum = list(accumulate(mix[n] for n in names))
+    counts = dict.fromkeys(names, 0) if stats is None else stats.setdefault("conversations", dict.fromkeys(names, 0))
+
+    heap = []
+    seq = 0
+    t = start
+    emitted = 0
+    while emitted < packets:
+        t += rng.expovariate(flows_per_sec)
+        # everything queued before the next conversation starts is final
+        while heap and heap[0][0] <= t and emitted < packets:
+            ts, _, frame = heapq.heappop(heap)
+            yield ts, frame
+            emitted += 1
+        name = names[bisect(cum, rng.random() * cum[-1])]
+        counts[name] += 1
+        for ts, frame in PROFILES[name](rng, t, hosts, payloads):
+            heapq.heappush(heap, (ts, seq, frame))
+            seq += 1
+    # conversations still open when the packet budget ran out are cut short
+
+
+def write_pcap(path: Path, packets: int, mix: dict, seed: int = 0, flows_per_sec: float = 2000.0) -> dict:
+    """Write the pcap and return a summary (also useful as a cache manifest)."""
+    stats = {"packets": packets, "mix": mix, "seed": seed, "flows_per_sec": flows_per_sec}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    first = last = None
+    with PcapWriter(path) as w:
+        for ts, frame in generate_packets(packets, mix, seed, flows_per_sec, stats=stats):
+            if first is None:
+                first = ts
+            last = ts
+            w.write(ts, frame)
+        stats["bytes"] = w.bytes
+    stats["duration_s"] = (last - first) if first is not None else 0.0
+    return stats
+
+
+# --- Flow rows -----------------------------------------------------------------
+
+def synth_flows(n: int, mix: dict, seed: int = 0):
+    """
+    `n` directed flow rows with the columns extract_from_pcap() produces,
+    drawn per profile from distributions that roughly match the pcap
+    generator. Rows are in ts_start order.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    hosts = Hosts(random.Random(seed))
+    clients = np.array([a for a, _ in hosts.clients])
+    servers = np.array([a for a, _ in hosts.servers])
+    scanners = np.array([a for a, _ in hosts.scanners])
+
+    names = list(mix)
+    weights = np.array([mix[k] for k in names], dtype=float)
+    kinds = rng.choice(len(names), size=n, p=weights / weights.sum())
+
+    frames = []
+    for i, name in enumerate(names):
+        m = int((kinds == i).sum())
+        if not m:
+            continue
+        if name == "dns":
+            pkt = np.ones(m, dtype=np.int64)
+            size = rng.integers(70, 350, m)
+            dur = np.zeros(m)
+            ent = rng.uniform(3.0, 5.0, m)
+            src, dst = rng.choice(clients, m), np.full(m, hosts.resolvers[0][0])
+            dport, proto, failed = np.full(m, 53), 17, np.zeros(m, dtype=np.int64)
+        elif name == "scan":
+            pkt = np.ones(m, dtype=np.int64)
+            size = rng.integers(54, 60, m)
+            dur = np.zeros(m)
+            ent = np.zeros(m)
+            src, dst = rng.choice(scanners, m), rng.choice(servers, m)
+            dport, proto, failed = rng.integers(1, 1025, m), 6, np.ones(m, dtype=np.int64)
+        else:
+            lo, hi, pkt_size = (3, 16, (60, 1400)) if name == "web" else (50, 400, (1200, 1454))
+            pkt = rng.integers(lo, hi, m)
+            size = (pkt * rng.uniform(*pkt_size, m)).astype(np.int64)
+            dur = rng.lognormal(3.0 if name == "web" else 4.5, 1.0, m)
+            ent = rng.uniform(4.5, 7.9, m) if name == "web" else rng.uniform(7.5, 8.0, m)
+            src, dst = rng.choice(clients, m), rng.choice(servers, m)
+            dport = rng.choice([80, 443] if name == "web" else [22, 443, 873], m)
+            proto, failed = 6, np.zeros(m, dtype=np.int64)
+        iat = np.where(pkt > 1, dur / np.maximum(pkt - 1, 1), 0.0)
+        frames.append(pd.DataFrame({
+            "src": src,
+            "dst": dst,
+            "sport": rng.integers(32768, 61000, m),
+            "dport": dport,
+            "proto": proto,
+            "ts_start": BASE_TS + np.sort(rng.uniform(0, max(n / 2000.0, 1.0), m)),
+            "handshake_failed": failed,
+            "pkt_count": pkt,
+            "bytes": size,
+            "duration_ms": dur,
+            "avg_pkt_size": size / pkt,
+            "iat_mean_ms": iat,
+            "iat_std_ms": iat * rng.uniform(0.2, 1.5, m),
+            "payload_entropy": ent,
+        }))
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values("ts_start", kind="stable", ignore_index=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Generate deterministic synthetic traffic")
+    size = ap.add_mutually_exclusive_group(required=True)
+    size.add_argument("--packets", type=parse_count, help="Write a pcap with this many packets (e.g. 10k, 100M)")
+    size.add_argument("--flows", type=parse_count, help="Write a flow CSV with this many rows instead")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help=f"profile=weight list (default: {DEFAULT_MIX})")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--flows-per-sec", type=float, default=2000.0, help="Conversation arrival rate in the pcap")
+    ap.add_argument("--out", required=True, help="Output .pcap (with --packets) or .csv (with --flows)")
+    args = ap.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        raise SystemExit(f"[err] {e}")
+    out = Path(args.out)
+
+    if args.flows:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        synth_flows(args.flows, mix, args.seed).to_csv(out, index=False)
+        print(f"[ok] wrote {args.flows} flows to {out}")
+        return
+
+    stats = write_pcap(out, args.packets, mix, args.seed, args.flows_per_sec)
+    print(f"[ok] wrote {stats['packets']} packets ({stats['bytes']} bytes) to {out}")
+    print(f"[ok] conversations: {json.dumps(stats['conversations'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Time-to-detect harness: replay attack pcaps (attacks/generate.py) through
+extraction, the per-host/window features and scoring, paced like live
+traffic, and measure how long each attack goes unnoticed.
+
+Packets are fed in micro-batches of --batch seconds of traffic time; feature
+state (host sketches, sliding windows) carries across batches as it does in
+the collector. Unless --model is given, the model is fitted on the traffic
+before the first attack (the warm-up) and replay starts where that ends.
+
+Per pcap it reports:
+  detect latency   traffic seconds from the attack's first packet until a
+                   batch containing a flagged attack flow finished scoring
+  recall           share of the attack's flows flagged
+  background FPR   share of the other flows flagged
+  headroom         traffic seconds replayed per second of busy processing;
+                   below 1.0 detection falls behind real time
+  max lag          worst delay behind the replay clock (paced runs only)
+
+  python benchmarks/time_to_detect.py data/attacks/scan.pcap --speed 10
+  python benchmarks/time_to_detect.py data/attacks/*.pcap --speed 0 --out ttd.json   # as fast as possible
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from attacks.generate import truth_path  # noqa: E402
+from feature_extractor.extract import add_host_features, add_window_features, extract_from_packets, load_scapy  # noqa: E402
+from feature_extractor.sketches import HostSketches  # noqa: E402
+from feature_extractor.windows import SlidingWindowAggregator  # noqa: E402
+from models.score import load_model, score_flows  # noqa: E402
+from models.train import train_model  # noqa: E402
+
+
+class Detector:
+    """Stateful micro-batch path: packets -> flows -> features -> scores."""
+
+    def __init__(self, window_s: int, model=None, bidirectional: bool = False):
+        self.sketches = HostSketches()
+        self.windows = SlidingWindowAggregator(window_s)
+        self.model = model
+        self.bidirectional = bidirectional
+
+    def features(self, pkts):
+        df = extract_from_packets(pkts, bidirectional=self.bidirectional)
+        if df.empty:
+            return df
+        df = df.sort_values("ts_start", kind="stable")
+        df, _ = add_host_features(df, self.sketches)
+        return add_window_features(df, agg=self.windows)
+
+    def score(self, pkts):
+        df = self.features(pkts)
+        return score_flows(df, self.model) if not df.empty else df
+
+
+def replay(pcap: Path, truth: dict, args) -> dict:
+    if load_scapy() is None:  # also registers the link layers PcapReader needs
+        raise SystemExit("[err] replay needs scapy (pip install scapy)")
+    from scapy.utils import PcapReader
+
+    attacks = [dict(a, flows=0, flagged=0, latency_s=None) for a in truth["attacks"]]
+    attack_hosts = {h for a in attacks for h in a["hosts"]}
+    first_attack = min(a["start"] for a in attacks)
+
+    model = load_model(Path(args.model)) if args.model else None
+    det = Detector(args.window, model, args.bidirectional)
+    reader = iter(PcapReader(str(pcap)))
+
+    pkt = next(reader, None)
+    if model is None:
+        warmup = []
+        while pkt is not None and float(pkt.time) < first_attack:
+            warmup.append(pkt)
+            pkt = next(reader, None)
+        df = det.features(warmup)
+        if df.empty:
+            raise SystemExit(f"[err] {pcap}: no traffic before the first attack to train on; pass --model")
+        det.model = train_model(df)
+        print(f"[ok] {pcap.name}: trained on {len(df)} warm-up flows ({len(warmup)} packets)")
+    if pkt is None:
+        raise SystemExit(f"[err] {pcap}: nothing left to replay")
+
+    t0 = float(pkt.time)
+    wall0 = time.perf_counter()
+    due = (lambda ts: wall0 + (ts - t0) / args.speed) if args.speed > 0 else (lambda ts: None)
+    slept = busy_scoring = max_lag = 0.0
+    packets = background_flows = background_flagged = batches = 0
+
+    def wait_until(ts):
+        nonlocal slept, max_lag
+        target = due(ts)
+        if target is None:
+            return
+        delay = target - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+            slept += delay
+        else:
+            max_lag = max(max_lag, -delay)
+
+    def close_batch(batch, boundary):
+        nonlocal busy_scoring, background_flows, background_flagged, batches
+        wait_until(boundary)  # the batch is only complete once its window has passed
+        started = time.perf_counter()
+        df = det.score(batch)
+        done = time.perf_counter()
+        busy_scoring += done - started
+        batches += 1
+        if df.empty:
+            return
+        is_attack = df["src"].isin(attack_hosts) | df["dst"].isin(attack_hosts)
+        background_flows += int((~is_attack).sum())
+        background_flagged += int(df.loc[~is_attack, "is_anomaly"].sum())
+        for a in attacks:
+            mask = df["src"].isin(a["hosts"]) | df["dst"].isin(a["hosts"])
+            flagged = int(df.loc[mask, "is_anomaly"].sum())
+            a["flows"] += int(mask.sum())
+            a["flagged"] += flagged
+            if flagged and a["latency_s"] is None:
+                if args.speed > 0:
+                    a["latency_s"] = (done - due(a["start"])) * args.speed
+                else:  # no pacing: batching delay plus this batch's processing time
+                    a["latency_s"] = boundary - a["start"] + (done - started)
+
+    batch, boundary = [], t0 + args.batch
+    last_ts = t0
+    while pkt is not None:
+        ts = float(pkt.time)
+        while ts >= boundary:
+            if batch:
+                close_batch(batch, boundary)
+                batch = []
+            boundary += args.batch
+        wait_until(ts)
+        batch.append(pkt)
+        packets += 1
+        last_ts = ts
+        pkt = next(reader, None)
+    if batch:
+        close_batch(batch, min(boundary, last_ts))
+
+    wall = time.perf_counter() - wall0
+    busy = wall - slept
+    span = last_ts - t0
+    return {
+        "pcap": str(pcap),
+        "speed": args.speed,
+        "batch_s": args.batch,
+        "packets": packets,
+        "batches": batches,
+        "traffic_s": span,
+        "wall_s": wall,
+        "busy_s": busy,
+        "scoring_s": busy_scoring,
+        "packets_per_busy_s": packets / busy if busy else None,
+        "headroom": span / busy if busy else None,
+        "max_lag_s": max_lag if args.speed > 0 else None,
+        "background_fpr": background_flagged / background_flows if background_flows else None,
+        "attacks": [
+            {
+                "name": a["name"],
+                "flows": a["flows"],
+                "recall": a["flagged"] / a["flows"] if a["flows"] else None,
+                "detected": a["latency_s"] is not None,
+                "latency_s": a["latency_s"],
+            }
+            for a in attacks
+        ],
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Replay attack pcaps and measure time to detect")
+    ap.add_argument("pcaps", nargs="+", help="pcaps from attacks/generate.py (truth file next to each)")
+    ap.add_argument("--speed", type=float, default=1.0, help="Replay speed-up (1 = real time, 0 = as fast as possible)")
+    ap.add_argument("--batch", type=float, default=5.0, help="Micro-batch length in traffic seconds")
+    ap.add_argument("--window", type=int, default=60, help="Sliding window (seconds) for per-source features")
+    ap.add_argument("--model", default="", help="Use this model instead of training on the warm-up traffic")
+    ap.add_argument("--bidirectional", action="store_true", help="Aggregate both directions of a conversation into one flow")
+    ap.add_argument("--out", default="", help="Also write the results as JSON")
+    args = ap.parse_args()
+
+    if args.batch <= 0 or args.speed < 0:
+        raise SystemExit("[err] --batch must be positive and --speed non-negative")
+
+    results = []
+    for p in map(Path, args.pcaps):
+        tp = truth_path(p)
+        if not tp.exists():
+            raise SystemExit(f"[err] no ground truth for {p} (expected {tp})")
+        r = replay(p, json.loads(tp.read_text()), args)
+        results.append(r)
+
+        lag = f", max lag {r['max_lag_s']:.2f}s" if r["max_lag_s"] is not None else ""
+        print(f"[ok] {p.name}: {r['packets']} packets in {r['wall_s']:.1f}s, "
+              f"{r['packets_per_busy_s']:.0f} pkt/s busy, headroom {r['headroom']:.2f}x real time{lag}")
+        if r["headroom"] < 1.0:
+            print(f"[warn] {p.name}: processing is slower than real time; detection would fall behind")
+        elif r["max_lag_s"] is not None and r["max_lag_s"] > args.batch:
+            print(f"[warn] {p.name}: fell behind at {args.speed:g}x; latency includes the backlog")
+        for a in r["attacks"]:
+            if a["detected"]:
+                print(f"       {a['name']:<8} detected after {a['latency_s']:6.2f}s, recall {a['recall']:.0%} of {a['flows']} flows")
+            else:
+                print(f"       {a['name']:<8} NOT detected ({a['flows']} flows)")
+        if r["background_fpr"] is not None:
+            print(f"       background flagged: {r['background_fpr']:.1%}")
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(results, indent=2))
+        print(f"[ok] wrote results to {out}")
+
+
+if __name__ == "__main__":
+    main()
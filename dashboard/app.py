@@ -1,17 +1,26 @@
 #!/usr/bin/env python3
-from flask import Flask, render_template_string, redirect, url_for, request, send_file
+from flask import Flask, render_template_string, redirect, url_for, request, send_file, Response, abort, g
 from pathlib import Path
 import os
-import pandas as pd
 import io
+import sys
 import subprocess
 import signal
 import time
-import base64
+import threading
+import sqlite3
+import zlib
+import json
 
-import matplotlib
-matplotlib.use("Agg")  # non-GUI backend for server
-import matplotlib.pyplot as plt
+try:
+    import metrics
+except ImportError:  # run as dashboard/app.py: put the repo root on sys.path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    import metrics
+
+# pandas, numpy and matplotlib are imported inside the functions that use
+# them, so the index page, the job routes and worker start-up don't pay for
+# loading them.
 
 app = Flask(__name__)
 
@@ -24,6 +33,14 @@ for p in (DATA_DIR, MODELS_DIR):
     p.mkdir(parents=True, exist_ok=True)
 
 CAPTURE_PID_FILE = DATA_DIR / "tcpdump.pid"
+SCORED_PATH = DATA_DIR / "scored.csv"
+FLOWS_DB_PATH = DATA_DIR / "scored.db"
+HOST_SKETCHES_PATH = DATA_DIR / "host_sketches.json"
+TABLE_ROWS = 100
+MAX_PAGE_ROWS = 1000
+EXPORT_DIR = DATA_DIR / "exports"
+EXPORT_BATCH_ROWS = 50_000
+SSE_POLL_SECONDS = 2.0
 
 # --- HTML templates ------------------------------------------------------------
 
@@ -160,6 +177,7 @@ INDEX_TEMPLATE = """
       <a class="btn btn-primary" href="{{ url_for('generate') }}">Generate demo features</a>
       <a class="btn btn-primary" href="{{ url_for('train') }}">Train model</a>
       <a class="btn btn-primary" href="{{ url_for('score') }}">Score flows</a>
+      <a class="btn btn-secondary" href="{{ url_for('pipeline') }}">Run all three in one go</a>
       {% if have_scored %}
         <a class="btn btn-secondary" href="{{ url_for('anomalies') }}">View anomalies</a>
         <a class="btn btn-secondary" href="{{ url_for('stats') }}">View stats</a>
@@ -314,12 +332,47 @@ ANOMALIES_TEMPLATE = """
     .tag-normal {
       color: #6ee7b7;
     }
+    .filters {
+      display: flex;
+      flex-wrap: wrap;
+      gap: 0.5rem;
+      align-items: flex-end;
+      margin: 0.5rem 0 1rem 0;
+    }
+    .filters label {
+      display: flex;
+      flex-direction: column;
+      color: #9ca3af;
+      font-size: 0.75rem;
+      text-transform: uppercase;
+      letter-spacing: 0.06em;
+    }
+    .filters input, .filters select {
+      margin-top: 0.2rem;
+      padding: 0.35rem 0.5rem;
+      border-radius: 6px;
+      border: 1px solid #374151;
+      background: #0f172a;
+      color: #e5e7eb;
+      width: 9rem;
+    }
+    .pager {
+      margin-top: 1rem;
+    }
+    .live-status {
+      color: #9ca3af;
+      font-size: 0.8rem;
+    }
+    tr.live-new td {
+      background: #1e1b4b;
+    }
   </style>
 </head>
 <body>
   <div class="container">
     <a href="{{ url_for('index') }}" class="btn">← Back to dashboard</a>
     <h1>Top Anomalous Flows</h1>
+    <div class="live-status" id="live-status">live updates: connecting…</div>
 
     <div>
       <a href="{{ url_for('anomalies', view='anom') }}"
@@ -333,31 +386,151 @@ ANOMALIES_TEMPLATE = """
       <a href="{{ url_for('download_anomalies') }}" class="btn">
         Download anomalies CSV
       </a>
+      <a href="{{ url_for('download_anomalies', compress='gzip') }}" class="btn">
+        Download anomalies CSV (gzip)
+      </a>
     </div>
 
+    {% if db_backed %}
+    <form class="filters" method="get" action="{{ url_for('anomalies') }}">
+      <input type="hidden" name="view" value="{{ view_mode }}">
+      <label>src <input name="src" value="{{ filters.src or '' }}"></label>
+      <label>dst <input name="dst" value="{{ filters.dst or '' }}"></label>
+      <label>dport <input name="dport" value="{{ filters.dport if filters.dport is not none else '' }}"></label>
+      <label>min score <input name="min_score" value="{{ filters.min_score if filters.min_score is not none else '' }}"></label>
+      <label>max score <input name="max_score" value="{{ filters.max_score if filters.max_score is not none else '' }}"></label>
+      <label>order
+        <select name="order">
+          <option value="asc" {% if filters.order == 'asc' %}selected{% endif %}>score ascending</option>
+          <option value="desc" {% if filters.order == 'desc' %}selected{% endif %}>score descending</option>
+        </select>
+      </label>
+      <label>rows <input name="limit" value="{{ filters.limit }}"></label>
+      <button class="btn" type="submit">Apply</button>
+    </form>
+    {% endif %}
+
     <div class="summary">
       <div class="summary-card">
         <div class="summary-label">Total flows</div>
-        <div class="summary-value">{{ total_flows }}</div>
+        <div class="summary-value" id="total-flows">{{ total_flows }}</div>
       </div>
       <div class="summary-card">
         <div class="summary-label">Anomalies</div>
-        <div class="summary-value">{{ num_anomalies }}</div>
+        <div class="summary-value" id="num-anomalies">{{ num_anomalies }}</div>
       </div>
       <div class="summary-card">
         <div class="summary-label">Anomaly rate</div>
-        <div class="summary-value">{{ percent_anomalies }}%</div>
+        <div class="summary-value" id="percent-anomalies">{{ percent_anomalies }}%</div>
       </div>
       <div class="summary-card">
         <div class="summary-label">Rows shown</div>
-        <div class="summary-value">{{ rows_shown }}</div>
+        <div class="summary-value" id="rows-shown">{{ rows_shown }}</div>
       </div>
     </div>
 
     <div class="table-wrapper">
       {{ table_html|safe }}
     </div>
+
+    {% if db_backed %}
+    <div class="pager">
+      {% if is_paged %}
+        <a href="{{ first_url }}" class="btn">« First page</a>
+      {% endif %}
+      {% if next_url %}
+        <a href="{{ next_url }}" class="btn">Next page »</a>
+      {% endif %}
+    </div>
+    {% endif %}
   </div>
+
+  <script>
+    // Apply pushed deltas instead of reloading the page. On the unfiltered
+    // first page, new anomalous rows are inserted where the page's sort order
+    // puts them and rows whose flows stopped being anomalous are removed.
+    (function () {
+      var liveRows = {{ 'true' if live_rows else 'false' }};
+      var order = "{{ live_order }}";
+      var maxRows = {{ live_limit }};
+      var status = document.getElementById("live-status");
+      var table = document.querySelector(".table-wrapper table");
+      var es = new EventSource("{{ url_for('anomalies_stream') }}");
+
+      es.onopen = function () { status.textContent = "live updates: on"; };
+      es.onerror = function () { status.textContent = "live updates: reconnecting…"; };
+
+      function columns() {
+        return Array.prototype.map.call(
+          table.querySelectorAll("thead th"), function (th) { return th.textContent; });
+      }
+
+      function sameValue(text, v) {
+        // to_html renders 80 as "80" but a NaN-widened column as "80.0"
+        return text === String(v) || (text !== "" && Number(text) === Number(v));
+      }
+
+      es.addEventListener("summary", function (ev) {
+        var d = JSON.parse(ev.data);
+        document.getElementById("total-flows").textContent = d.total_flows;
+        document.getElementById("num-anomalies").textContent = d.num_anomalies;
+        var pct = d.total_flows ? (d.num_anomalies / d.total_flows * 100) : 0;
+        document.getElementById("percent-anomalies").textContent = pct.toFixed(2) + "%";
+        status.textContent = "live updates: on (" +
+          (d.delta_anomalies >= 0 ? "+" : "") + d.delta_anomalies + " anomalies in last scoring run)";
+      });
+
+      es.addEventListener("anomalies", function (ev) {
+        if (!liveRows || !table) { return; }
+        var d = JSON.parse(ev.data);
+        var cols = columns();
+        var scoreIdx = cols.indexOf("anomaly_score");
+        var body = table.querySelector("tbody");
+        d.rows.forEach(function (row) {
+          var at = null;
+          if (scoreIdx >= 0) {
+            var score = row.anomaly_score;
+            for (var i = 0; i < body.rows.length; i++) {
+              var s = parseFloat(body.rows[i].cells[scoreIdx].textContent);
+              if (order === "desc" ? s < score : s > score) { at = body.rows[i]; break; }
+            }
+            if (at === null && body.rows.length >= maxRows) { return; }  // past this page
+          }
+          var tr = document.createElement("tr");
+          tr.className = "live-new";
+          cols.forEach(function (c) {
+            var td = document.createElement("td");
+            var v = row[c];
+            if (c === "is_anomaly") { v = v === 1 ? "ANOMALY" : "normal"; }
+            td.textContent = v === null || v === undefined ? "" : v;
+            tr.appendChild(td);
+          });
+          body.insertBefore(tr, at);
+          while (body.rows.length > maxRows) { body.deleteRow(-1); }
+        });
+        document.getElementById("rows-shown").textContent = body.rows.length;
+      });
+
+      es.addEventListener("resolved", function (ev) {
+        if (!liveRows || !table) { return; }
+        var d = JSON.parse(ev.data);
+        var cols = columns();
+        var body = table.querySelector("tbody");
+        for (var i = body.rows.length - 1; i >= 0; i--) {
+          var cells = body.rows[i].cells;
+          // each key holds the flow-key columns (src, dst, ports, proto) the store has
+          var gone = d.keys.some(function (key) {
+            return Object.keys(key).every(function (c) {
+              var j = cols.indexOf(c);
+              return j >= 0 && sameValue(cells[j].textContent, key[c]);
+            });
+          });
+          if (gone) { body.deleteRow(i); }
+        }
+        document.getElementById("rows-shown").textContent = body.rows.length;
+      });
+    })();
+  </script>
 </body>
 </html>
 """
@@ -449,6 +622,24 @@ STATS_TEMPLATE = """
       margin-bottom: 0.5rem;
       color: #e5e7eb;
     }
+    .chart-title a {
+      color: #9ca3af;
+      font-size: 0.8rem;
+    }
+    table {
+      width: 100%;
+      border-collapse: collapse;
+      font-size: 0.83rem;
+    }
+    th, td {
+      padding: 0.3rem 0.5rem;
+      border-bottom: 1px solid #1f2937;
+      text-align: left;
+    }
+    .muted {
+      color: #9ca3af;
+      font-size: 0.8rem;
+    }
     img {
       max-width: 100%;
       height: auto;
@@ -485,21 +676,60 @@ STATS_TEMPLATE = """
     <div class="chart-grid">
       <div class="chart-card">
         <div class="chart-title">Anomaly score distribution</div>
-        {% if hist_img %}
-          <img src="data:image/png;base64,{{ hist_img }}" alt="Histogram of anomaly scores">
+        {% if hist_url %}
+          <img src="{{ hist_url }}" alt="Histogram of anomaly scores">
         {% else %}
           <p>No anomaly_score column found in scored.csv.</p>
         {% endif %}
       </div>
       <div class="chart-card">
         <div class="chart-title">Top 10 source IPs by flow count</div>
-        {% if bar_img %}
-          <img src="data:image/png;base64,{{ bar_img }}" alt="Top source IPs bar chart">
+        {% if bar_url %}
+          <img src="{{ bar_url }}" alt="Top source IPs bar chart">
         {% else %}
           <p>No src column found in scored.csv.</p>
         {% endif %}
       </div>
     </div>
+
+    {% if trend_url %}
+    <div class="chart-card" style="margin-top:1.5rem;">
+      <div class="chart-title">
+        Flows and anomalies over time
+        (<a href="{{ url_for('stats_rollups', granularity='minute') }}">per-minute JSON</a>,
+        <a href="{{ url_for('stats_rollups', granularity='hour') }}">per-hour JSON</a>)
+      </div>
+      <img src="{{ trend_url }}" alt="Flows and anomalies over time">
+    </div>
+    {% endif %}
+
+    {% if sketches %}
+    <div class="chart-grid">
+      <div class="chart-card">
+        <div class="chart-title">Top talkers (Space-Saving, k={{ sketches.k }})</div>
+        <table>
+          <thead><tr><th>src</th><th>flows</th><th>± error</th></tr></thead>
+          <tbody>
+          {% for h in top_talkers %}
+            <tr><td>{{ h.host }}</td><td>{{ h.flows }}</td><td>{{ h.error }}</td></tr>
+          {% endfor %}
+          </tbody>
+        </table>
+      </div>
+      <div class="chart-card">
+        <div class="chart-title">Widest fan-out (HyperLogLog estimates)</div>
+        <table>
+          <thead><tr><th>src</th><th>distinct dports</th><th>distinct dsts</th></tr></thead>
+          <tbody>
+          {% for h in fanout %}
+            <tr><td>{{ h.host }}</td><td>{{ h.distinct_dport }}</td><td>{{ h.distinct_dst }}</td></tr>
+          {% endfor %}
+          </tbody>
+        </table>
+      </div>
+    </div>
+    <p class="muted">Sketch summary over {{ sketches.flows_seen }} flows from the last feature extraction.</p>
+    {% endif %}
   </div>
 </body>
 </html>
@@ -521,6 +751,469 @@ def capture_running() -> bool:
             pass
         return False
 
+
+# --- Scored-data cache ---------------------------------------------------------
+#
+# Parsing scored.csv dominates every /anomalies, /stats and /download_anomalies
+# request once the file grows past a few hundred thousand rows. We parse it once
+# per process, keyed on (mtime, size), and precompute the derived views the
+# routes need so a page load only touches small, already-sorted frames.
+
+_scored_lock = threading.Lock()
+_scored_cache = {"entry": None}  # (file key, views) swapped atomically
+
+
+def _scored_key(path: Path):
+    st = path.stat()
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _build_scored_views(df: "pandas.DataFrame", key) -> dict:
+    import numpy as np
+
+    total = len(df)
+    has_flag = "is_anomaly" in df.columns
+    has_score = "anomaly_score" in df.columns
+
+    anom_mask = df["is_anomaly"] == 1 if has_flag else None
+    num_anom = int(anom_mask.sum()) if has_flag else 0
+
+    sorted_all = df.sort_values("anomaly_score", ascending=True) if has_score else df
+    sorted_anom = sorted_all[sorted_all["is_anomaly"] == 1] if has_flag else sorted_all
+
+    score_summary = None
+    score_hist = None
+    if has_score and total > 0:
+        scores = df["anomaly_score"].dropna()
+        score_summary = {
+            "mean": float(scores.mean()),
+            "min": float(scores.min()),
+            "max": float(scores.max()),
+        }
+        score_hist = np.histogram(scores, bins=30)
+
+    top_src = df["src"].value_counts().head(10) if "src" in df.columns and total > 0 else None
+
+    return {
+        # copies, so the cache doesn't keep the full sorted frames alive
+        "table_all": sorted_all.head(TABLE_ROWS).copy(),
+        "table_anom": sorted_anom.head(TABLE_ROWS).copy(),
+        "total": total,
+        "num_anomalies": num_anom,
+        "score_hist": score_hist,  # (counts, edges)
+        "score_summary": score_summary,
+        "top_src": top_src,
+        # identifies this parse of scored.csv for chart ETags
+        "version": f"{key[0]:x}-{key[1]:x}",
+        "last_modified": key[0] / 1e9,
+        "charts": {},
+        "charts_lock": threading.Lock(),
+    }
+
+
+def load_scored() -> dict:
+    """
+    Return the cached views over data/scored.csv, re-parsing only when the
+    file's mtime or size changed (or after invalidate_scored_cache()).
+    Raises FileNotFoundError if the file is missing.
+    """
+    key = _scored_key(SCORED_PATH)
+    entry = _scored_cache["entry"]
+    if entry is not None and entry[0] == key:
+        return entry[1]
+
+    import pandas as pd
+
+    with _scored_lock:
+        # another request may have rebuilt it while we waited
+        key = _scored_key(SCORED_PATH)
+        entry = _scored_cache["entry"]
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        with metrics.REGISTRY.gauge("ath_dashboard_cache_build_seconds", "Wall time of the last scored-data cache rebuild").time():
+            views = _build_scored_views(pd.read_csv(SCORED_PATH), key)
+        _scored_cache["entry"] = (key, views)
+        return views
+
+
+def invalidate_scored_cache() -> None:
+    _scored_cache["entry"] = None
+
+
+# --- Live anomaly feed ---------------------------------------------------------
+#
+# Every scoring run that writes scored.db appends a summary event (counter
+# deltas) and, if any, events with the newly anomalous flows and with the keys
+# of flows that are no longer anomalous to the store's scoring_events table
+# (see models/score.py). Event ids carry over from one
+# store to the next, so every dashboard process serves the same sequence and a
+# Last-Event-ID from one worker means the same thing to any other.
+# /anomalies/stream polls the store's (mtime, size) and replays new events as
+# Server-Sent Events; it never touches scored.csv.
+
+def read_events(after_id: int) -> tuple:
+    """(events after `after_id`, newest event id) from scored.db; ([], 0) without a store."""
+    if not FLOWS_DB_PATH.exists():
+        return [], 0
+    con = _open_flow_store()
+    try:
+        has_events = con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scoring_events'"
+        ).fetchone()
+        if not has_events:
+            return [], 0
+        latest = con.execute("SELECT COALESCE(MAX(event_id), 0) FROM scoring_events").fetchone()[0]
+        if latest < after_id:
+            after_id = 0  # the store was recreated and its ids started over
+        rows = con.execute(
+            "SELECT event_id, name, data FROM scoring_events WHERE event_id > ? ORDER BY event_id",
+            (after_id,),
+        ).fetchall()
+    finally:
+        con.close()
+    return rows, latest
+
+
+# --- Stats charts --------------------------------------------------------------
+#
+# Each chart is rendered at most once per scored-data version and kept on the
+# cached views. /stats links to them instead of inlining base64, so browsers
+# can cache the PNGs and revalidate with If-None-Match / If-Modified-Since.
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")  # non-GUI backend for server
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _fig_to_png(fig) -> bytes:
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    _pyplot().close(fig)
+    return buf.getvalue()
+
+
+def _render_score_hist(views: dict):
+    if views["score_summary"] is None:
+        return None
+    counts, edges = views["score_hist"]
+    plt = _pyplot()
+    fig = plt.figure(figsize=(6, 3))
+    plt.stairs(counts, edges, fill=True)
+    plt.xlabel("anomaly_score")
+    plt.ylabel("Count")
+    plt.title("Anomaly score distribution")
+    return _fig_to_png(fig)
+
+
+def _render_top_src(views: dict):
+    counts = views["top_src"]
+    if counts is None:
+        return None
+    plt = _pyplot()
+    fig = plt.figure(figsize=(6, 3))
+    plt.bar(counts.index.astype(str), counts.values)
+    plt.xticks(rotation=45, ha="right")
+    plt.xlabel("src")
+    plt.ylabel("Flow count")
+    plt.title("Top 10 source IPs")
+    fig.tight_layout()
+    return _fig_to_png(fig)
+
+
+def _render_trend(views: dict):
+    trend = views.get("trend")
+    if trend is None or trend.empty:
+        return None
+    import pandas as pd
+
+    plt = _pyplot()
+    when = pd.to_datetime(trend["bucket"], unit="s")
+    fig = plt.figure(figsize=(12, 3))
+    plt.plot(when, trend["flows"], label="flows")
+    plt.plot(when, trend["anomalies"], label="anomalies")
+    plt.xlabel(f"flow start ({views['granularity']}, UTC)")
+    plt.ylabel("Count")
+    plt.title(f"Flows and anomalies per {views['granularity']}")
+    plt.legend()
+    fig.autofmt_xdate()
+    return _fig_to_png(fig)
+
+
+CHARTS = {
+    "score_hist": _render_score_hist,
+    "top_src": _render_top_src,
+    "trend": _render_trend,
+}
+
+
+def get_chart(views: dict, name: str):
+    """PNG bytes for chart `name` (None if the data has no such column)."""
+    charts = views["charts"]
+    if name not in charts:
+        with views["charts_lock"]:
+            if name not in charts:
+                charts[name] = CHARTS[name](views)
+    return charts[name]
+
+
+# --- Indexed flow store --------------------------------------------------------
+#
+# models/score.py also writes data/scored.db, an SQLite copy of scored.csv with
+# indexes on anomaly_score, is_anomaly, src, dst and dport, each ending in the
+# sort key (anomaly_score, flow_id). /anomalies pages through it with keyset
+# pagination: the cursor is the (anomaly_score, flow_id) of the last row shown,
+# so every page is a bounded index range scan no matter how deep the analyst
+# goes or how many flows the filtered host has. Only scored.db files at least
+# as new as scored.csv are used.
+
+def flow_store_current() -> bool:
+    """
+    True when scored.db exists and is not older than scored.csv. A run with
+    --no-db rewrites only the CSV, leaving a store that no longer matches it.
+    """
+    try:
+        db_mtime = FLOWS_DB_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return False
+    try:
+        return db_mtime >= SCORED_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return True
+
+
+def parse_flow_filters(args) -> dict:
+    """Parse /anomalies query args. Raises ValueError on malformed input."""
+    def opt(name, cast):
+        raw = args.get(name, "").strip()
+        return cast(raw) if raw else None
+
+    order = args.get("order", "asc")
+    if order not in ("asc", "desc"):
+        raise ValueError(f"order must be 'asc' or 'desc', not {order!r}")
+
+    limit = opt("limit", int) or TABLE_ROWS
+    if not 1 <= limit <= MAX_PAGE_ROWS:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_ROWS}")
+
+    after = None
+    raw_after = args.get("after", "").strip()
+    if raw_after:
+        score_part, _, id_part = raw_after.rpartition(":")
+        after = (float(score_part), int(id_part))
+
+    return {
+        "src": opt("src", str),
+        "dst": opt("dst", str),
+        "dport": opt("dport", int),
+        "min_score": opt("min_score", float),
+        "max_score": opt("max_score", float),
+        "order": order,
+        "limit": limit,
+        "after": after,
+    }
+
+
+def query_flows(view_mode: str, filters: dict):
+    """
+    Return (page DataFrame, next cursor or None) from the flow store.
+    """
+    import pandas as pd
+
+    where, params = [], []
+    if view_mode == "anom":
+        where.append("is_anomaly = 1")
+    for col in ("src", "dst", "dport"):
+        if filters[col] is not None:
+            where.append(f"{col} = ?")
+            params.append(filters[col])
+    if filters["min_score"] is not None:
+        where.append("anomaly_score >= ?")
+        params.append(filters["min_score"])
+    if filters["max_score"] is not None:
+        where.append("anomaly_score <= ?")
+        params.append(filters["max_score"])
+
+    direction = "ASC" if filters["order"] == "asc" else "DESC"
+    if filters["after"] is not None:
+        last_score, last_id = filters["after"]
+        op = ">" if direction == "ASC" else "<"
+        # the first term gives SQLite an index range; the second breaks ties
+        where.append(
+            f"anomaly_score {op}= ? AND (anomaly_score {op} ? OR flow_id {op} ?)"
+        )
+        params.extend([last_score, last_score, last_id])
+
+    sql = "SELECT * FROM flows"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY anomaly_score {direction}, flow_id {direction} LIMIT ?"
+    params.append(filters["limit"] + 1)
+
+    con = _open_flow_store()
+    try:
+        page = pd.read_sql_query(sql, con, params=params)
+    finally:
+        con.close()
+
+    next_cursor = None
+    if len(page) > filters["limit"]:
+        page = page.iloc[: filters["limit"]]
+        last = page.iloc[-1]
+        next_cursor = f"{float(last['anomaly_score'])!r}:{int(last['flow_id'])}"
+
+    return page.drop(columns=["flow_id"]), next_cursor
+
+
+# --- Rollups -------------------------------------------------------------------
+#
+# score.py materializes per-minute and per-hour rollups (flow/anomaly counts,
+# a fixed-bin score histogram, per-src/dst counts) into scored.db. /stats reads
+# those instead of the raw flows, so its cost scales with the number of time
+# buckets, not the number of flows.
+
+ROLLUP_GRANULARITIES = ("minute", "hour")
+TREND_MAX_MINUTES = 6 * 60  # longer spans are charted per hour
+
+_rollup_lock = threading.Lock()
+_rollup_cache = {"entry": None}
+
+
+def _open_flow_store():
+    return sqlite3.connect(f"file:{FLOWS_DB_PATH}?mode=ro", uri=True)
+
+
+def _build_rollup_views(con, key) -> dict:
+    import numpy as np
+    import pandas as pd
+
+    meta = dict(con.execute("SELECT key, value FROM meta").fetchall())
+    hour = pd.read_sql_query(
+        "SELECT bucket, flows, anomalies, score_min, score_max, score_sum "
+        "FROM rollup_flows WHERE granularity = 'hour' ORDER BY bucket",
+        con,
+    )
+    total = int(hour["flows"].sum())
+
+    score_summary = None
+    score_hist = None
+    if total > 0:
+        score_summary = {
+            "mean": float(hour["score_sum"].sum() / total),
+            "min": float(hour["score_min"].min()),
+            "max": float(hour["score_max"].max()),
+        }
+        n_bins = int(meta["hist_bins"])
+        bins = pd.read_sql_query(
+            "SELECT bin, SUM(count) AS count FROM rollup_score_hist "
+            "WHERE granularity = 'hour' GROUP BY bin",
+            con,
+        )
+        counts = np.zeros(n_bins)
+        counts[bins["bin"].to_numpy()] = bins["count"].to_numpy()
+        edges = np.linspace(meta["hist_lo"], meta["hist_hi"], n_bins + 1)
+        # trim the empty tails of the fixed-range histogram for display
+        used = np.flatnonzero(counts)
+        score_hist = (counts[used[0]:used[-1] + 1], edges[used[0]:used[-1] + 2])
+
+    top = pd.read_sql_query(
+        "SELECT host, SUM(flows) AS flows FROM rollup_hosts "
+        "WHERE granularity = 'hour' AND role = 'src' "
+        "GROUP BY host ORDER BY flows DESC LIMIT 10",
+        con,
+    )
+    top_src = top.set_index("host")["flows"] if total > 0 else None
+
+    granularity = "minute"
+    if len(hour) and hour["bucket"].iloc[-1] - hour["bucket"].iloc[0] > TREND_MAX_MINUTES * 60:
+        granularity = "hour"
+    trend = hour if granularity == "hour" else pd.read_sql_query(
+        "SELECT bucket, flows, anomalies FROM rollup_flows "
+        "WHERE granularity = 'minute' ORDER BY bucket",
+        con,
+    )
+
+    return {
+        "total": total,
+        "num_anomalies": int(hour["anomalies"].sum()),
+        "score_summary": score_summary,
+        "score_hist": score_hist,
+        "top_src": top_src,
+        "trend": trend[["bucket", "flows", "anomalies"]],
+        "granularity": granularity,
+        "version": f"db-{key[0]:x}-{key[1]:x}",
+        "last_modified": key[0] / 1e9,
+        "charts": {},
+        "charts_lock": threading.Lock(),
+    }
+
+
+def load_rollups():
+    """
+    Cached rollup views from data/scored.db, or None when there is no current
+    store or it was written without rollups (features lacking ts_start).
+    """
+    if not flow_store_current():
+        return None
+    key = _scored_key(FLOWS_DB_PATH)
+    entry = _rollup_cache["entry"]
+    if entry is not None and entry[0] == key:
+        return entry[1]
+
+    with _rollup_lock:
+        entry = _rollup_cache["entry"]
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        con = _open_flow_store()
+        try:
+            has_rollups = con.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollup_flows'"
+            ).fetchone()
+            views = _build_rollup_views(con, key) if has_rollups else None
+        finally:
+            con.close()
+        _rollup_cache["entry"] = (key, views)
+        return views
+
+
+def load_host_sketches():
+    """Top-talker / fan-out summary written by extract.py (bounded to k hosts)."""
+    if not HOST_SKETCHES_PATH.exists():
+        return None
+    try:
+        return json.loads(HOST_SKETCHES_PATH.read_text())
+    except ValueError:
+        return None
+
+
+def stats_views() -> dict:
+    """Rollup-backed views when available, else the cached scored.csv views."""
+    return load_rollups() or load_scored()
+
+
+def flow_store_counts() -> tuple:
+    """(total_flows, num_anomalies) as recorded by score.py at write time."""
+    con = _open_flow_store()
+    try:
+        meta = dict(con.execute("SELECT key, value FROM meta").fetchall())
+    finally:
+        con.close()
+    return int(meta.get("total_flows", 0)), int(meta.get("num_anomalies", 0))
+
+def warm_caches() -> None:
+    """
+    Build the read-only caches up front: scored.csv views, rollups and the
+    chart PNGs. dashboard/serve.py calls this in the master process before
+    forking, so every worker starts with (and shares) the same copy.
+    """
+    if not SCORED_PATH.exists():
+        return
+    load_scored()
+    views = stats_views()
+    for name in CHARTS:
+        get_chart(views, name)
+
 # --- Routes --------------------------------------------------------------------
 
 @app.route("/")
@@ -528,7 +1221,7 @@ def index():
     data_dir = str(DATA_DIR.resolve())
     have_features = (DATA_DIR / "features.csv").exists()
     have_model = (MODELS_DIR / "model.pkl").exists()
-    have_scored = (DATA_DIR / "scored.csv").exists()
+    have_scored = SCORED_PATH.exists()
     have_capture_running = capture_running()
 
     return render_template_string(
@@ -541,6 +1234,41 @@ def index():
     )
 
 
+def run_pipeline(*extra_args) -> None:
+    """
+    Extract, train and score in one subprocess (pipeline.py), keeping the
+    feature CSV and sketch summary for the status cards and /stats.
+    """
+    subprocess.run(
+        [
+            "python", "pipeline.py",
+            "--model", str(MODELS_DIR / "model.pkl"),
+            "--out", str(SCORED_PATH),
+            "--db", str(FLOWS_DB_PATH),
+            "--write-features", str(DATA_DIR / "features.csv"),
+            "--write-sketches", str(HOST_SKETCHES_PATH),
+            *extra_args,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    invalidate_scored_cache()
+
+
+@app.route("/pipeline")
+def pipeline():
+    try:
+        run_pipeline()
+    except subprocess.CalledProcessError as e:
+        return (
+            f"Pipeline failed (exit {e.returncode})."
+            f"<pre>{e.stderr}</pre>",
+            500,
+        )
+    return redirect(url_for("anomalies"))
+
+
 @app.route("/generate")
 def generate():
     try:
@@ -597,7 +1325,8 @@ def score():
                 "models/score.py",
                 "--csv", str(csv_path),
                 "--model", str(model_path),
-                "--out", str(DATA_DIR / "scored.csv"),
+                "--out", str(SCORED_PATH),
+                "--db", str(FLOWS_DB_PATH),
             ],
             check=True,
             capture_output=True,
@@ -609,34 +1338,44 @@ def score():
             f"<pre>{e.stderr}</pre>",
             500,
         )
+    invalidate_scored_cache()
     return redirect(url_for("anomalies"))
 
 
 @app.route("/anomalies")
 def anomalies():
-    scored_path = DATA_DIR / "scored.csv"
-    if not scored_path.exists():
+    if not SCORED_PATH.exists():
         return "No data/scored.csv found. Click 'Score flows' on the home page first.", 404
 
-    try:
-        df = pd.read_csv(scored_path)
-    except Exception as e:
-        return f"Failed to read data/scored.csv: {e}", 500
-
-    total = len(df)
-    num_anom = int(df["is_anomaly"].sum()) if "is_anomaly" in df.columns else 0
-    percent = (num_anom / total * 100.0) if total else 0.0
-
     view_mode = request.args.get("view", "anom")
-    df_view = df
-
-    if "anomaly_score" in df.columns:
-        df_view = df_view.sort_values("anomaly_score", ascending=True)
+    db_backed = flow_store_current()
+    filters = None
+    next_url = None
 
-    if view_mode == "anom" and "is_anomaly" in df_view.columns:
-        df_view = df_view[df_view["is_anomaly"] == 1]
+    if db_backed:
+        try:
+            filters = parse_flow_filters(request.args)
+        except ValueError as e:
+            return f"Invalid filter: {e}", 400
+        try:
+            total, num_anom = flow_store_counts()
+            df_view, next_cursor = query_flows(view_mode, filters)
+        except Exception as e:
+            return f"Failed to query data/scored.db: {e}", 500
+        if next_cursor is not None:
+            next_args = request.args.to_dict()
+            next_args["after"] = next_cursor
+            next_url = url_for("anomalies", **next_args)
+    else:
+        try:
+            views = load_scored()
+        except Exception as e:
+            return f"Failed to read data/scored.csv: {e}", 500
+        total = views["total"]
+        num_anom = views["num_anomalies"]
+        df_view = views["table_anom"] if view_mode == "anom" else views["table_all"]
 
-    df_view = df_view.head(100)
+    percent = (num_anom / total * 100.0) if total else 0.0
     rows_shown = len(df_view)
 
     if "is_anomaly" in df_view.columns:
@@ -647,6 +1386,9 @@ def anomalies():
 
     table_html = df_view.to_html(classes="table", index=False)
 
+    first_args = request.args.to_dict()
+    first_args.pop("after", None)
+
     return render_template_string(
         ANOMALIES_TEMPLATE,
         total_flows=total,
@@ -655,98 +1397,369 @@ def anomalies():
         rows_shown=rows_shown,
         table_html=table_html,
         view_mode=view_mode,
+        live_rows=view_mode == "anom" and not any(
+            request.args.get(k) for k in ("src", "dst", "dport", "min_score", "max_score", "after")
+        ),
+        live_order=filters["order"] if db_backed else "asc",
+        live_limit=filters["limit"] if db_backed else TABLE_ROWS,
+        db_backed=db_backed,
+        filters=filters,
+        is_paged="after" in request.args,
+        first_url=url_for("anomalies", **first_args),
+        next_url=next_url,
+    )
+
+
+@app.route("/anomalies/stream")
+def anomalies_stream():
+    try:
+        last_id = int(request.headers.get("Last-Event-ID", ""))
+    except ValueError:
+        last_id = None  # new subscriber: only future events
+
+    def generate():
+        nonlocal last_id
+        yield f"retry: {int(SSE_POLL_SECONDS * 1000)}\n\n"
+        seen_key = None
+        while True:
+            # a new scoring run replaces scored.db, which changes its key
+            key = _scored_key(FLOWS_DB_PATH) if FLOWS_DB_PATH.exists() else None
+            pending = []
+            if key != seen_key:
+                seen_key = key
+                try:
+                    pending, latest = read_events(last_id or 0)
+                except sqlite3.Error:
+                    seen_key = None  # mid-replace; retry on the next poll
+                else:
+                    if last_id is None:
+                        pending, last_id = [], latest
+            if not pending:
+                yield ": keepalive\n\n"
+            for event_id, name, data in pending:
+                yield f"id: {event_id}\nevent: {name}\ndata: {data}\n\n"
+                last_id = event_id
+            time.sleep(SSE_POLL_SECONDS)
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+# --- Anomaly export ------------------------------------------------------------
+#
+# The anomalous flows are read and serialized EXPORT_BATCH_ROWS at a time and
+# streamed, so peak memory is one batch no matter how large the data is: from
+# scored.db through the is_anomaly index when the store is current, otherwise
+# from scored.csv in chunks, filtered chunk by chunk. While streaming, the
+# bytes are also written to data/exports/; once a version has been exported in
+# full, later downloads and Range/resume requests are served from that file.
+
+def export_source() -> tuple:
+    """(version, batch iterator factory) for the anomaly export."""
+    import pandas as pd
+
+    if flow_store_current():
+        key = _scored_key(FLOWS_DB_PATH)
+
+        def batches():
+            con = _open_flow_store()
+            try:
+                # backwards over idx_flows_anom_score: most suspicious first, no sort
+                for batch in pd.read_sql_query(
+                    "SELECT * FROM flows WHERE is_anomaly = 1 "
+                    "ORDER BY anomaly_score DESC, flow_id DESC",
+                    con, chunksize=EXPORT_BATCH_ROWS,
+                ):
+                    yield batch.drop(columns=["flow_id"])
+            finally:
+                con.close()
+
+        return f"db-{key[0]:x}-{key[1]:x}", batches
+
+    key = _scored_key(SCORED_PATH)
+
+    def batches():
+        for chunk in pd.read_csv(SCORED_PATH, chunksize=EXPORT_BATCH_ROWS):
+            yield chunk[chunk["is_anomaly"] == 1] if "is_anomaly" in chunk.columns else chunk
+
+    return f"{key[0]:x}-{key[1]:x}", batches
+
+
+def _export_chunks(batches, gzip_out: bool):
+    comp = zlib.compressobj(wbits=31) if gzip_out else None  # 31 = gzip container
+    header = True
+    for batch in batches:
+        if batch.empty and not header:
+            continue
+        chunk = batch.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+        if comp is not None:
+            chunk = comp.compress(chunk)
+        if chunk:
+            yield chunk
+    if comp is not None:
+        yield comp.flush()
+
+
+def _tee_to_file(chunks, path: Path):
+    """Yield chunks while writing them to `path`; keep the file only if complete."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb") as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+                yield chunk
+        os.replace(tmp, path)
+        for old in EXPORT_DIR.glob("anomalies-*"):
+            if old.suffix != ".tmp" and old.name.split(".")[0] != path.name.split(".")[0]:
+                old.unlink(missing_ok=True)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
 @app.route("/download_anomalies")
 def download_anomalies():
-    scored_path = DATA_DIR / "scored.csv"
-    if not scored_path.exists():
+    if not SCORED_PATH.exists():
         return "No data/scored.csv found. Click 'Score flows' on the home page first.", 404
 
     try:
-        df = pd.read_csv(scored_path)
+        version, batches = export_source()
     except Exception as e:
-        return f"Failed to read data/scored.csv: {e}", 500
+        return f"Failed to read scored data: {e}", 500
 
-    if "is_anomaly" in df.columns:
-        df = df[df["is_anomaly"] == 1]
+    gzip_out = request.args.get("compress") == "gzip"
+    suffix = ".csv.gz" if gzip_out else ".csv"
+    mimetype = "application/gzip" if gzip_out else "text/csv"
+    download_name = "anomalies" + suffix
+    etag = f"anomalies-{version}{'-gz' if gzip_out else ''}"
+
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    export_path = EXPORT_DIR / f"anomalies-{version}{suffix}"
+
+    if not export_path.exists() and request.range is not None:
+        # a resumed download needs a stable file to seek into
+        for _ in _tee_to_file(_export_chunks(batches(), gzip_out), export_path):
+            pass
 
-    buf = io.StringIO()
-    df.to_csv(buf, index=False)
-    buf.seek(0)
+    if export_path.exists():
+        return send_file(
+            export_path.resolve(),  # Flask resolves relative paths against the app root
+            mimetype=mimetype,
+            as_attachment=True,
+            download_name=download_name,
+            etag=etag,
+            conditional=True,
+        )
 
-    return send_file(
-        io.BytesIO(buf.getvalue().encode("utf-8")),
-        mimetype="text/csv",
-        as_attachment=True,
-        download_name="anomalies.csv",
+    resp = Response(
+        _tee_to_file(_export_chunks(batches(), gzip_out), export_path),
+        mimetype=mimetype,
     )
+    resp.headers["Content-Disposition"] = f"attachment; filename={download_name}"
+    resp.headers["Accept-Ranges"] = "bytes"
+    resp.set_etag(etag)
+    return resp
 
 
 @app.route("/stats")
 def stats():
-    scored_path = DATA_DIR / "scored.csv"
-    if not scored_path.exists():
+    if not SCORED_PATH.exists():
         return "No data/scored.csv found. Click 'Score flows' on the home page first.", 404
 
     try:
-        df = pd.read_csv(scored_path)
+        views = stats_views()
     except Exception as e:
-        return f"Failed to read data/scored.csv: {e}", 500
-
-    total = len(df)
-    num_anom = int(df["is_anomaly"].sum()) if "is_anomaly" in df.columns else 0
+        return f"Failed to read scored data: {e}", 500
 
-    if "anomaly_score" in df.columns and total > 0:
-        scores = df["anomaly_score"].dropna()
-        score_mean = f"{scores.mean():.4f}"
-        score_min = f"{scores.min():.4f}"
-        score_max = f"{scores.max():.4f}"
-
-        # Histogram
-        fig1 = plt.figure(figsize=(6, 3))
-        plt.hist(scores, bins=30)
-        plt.xlabel("anomaly_score")
-        plt.ylabel("Count")
-        plt.title("Anomaly score distribution")
-        buf1 = io.BytesIO()
-        fig1.savefig(buf1, format="png", bbox_inches="tight")
-        plt.close(fig1)
-        buf1.seek(0)
-        hist_img = base64.b64encode(buf1.getvalue()).decode("ascii")
+    summary = views["score_summary"]
+    if summary is not None:
+        score_mean = f"{summary['mean']:.4f}"
+        score_min = f"{summary['min']:.4f}"
+        score_max = f"{summary['max']:.4f}"
     else:
         score_mean = score_min = score_max = "N/A"
-        hist_img = None
-
-    bar_img = None
-    if "src" in df.columns and total > 0:
-        counts = df["src"].value_counts().head(10)
-        fig2 = plt.figure(figsize=(6, 3))
-        plt.bar(counts.index.astype(str), counts.values)
-        plt.xticks(rotation=45, ha="right")
-        plt.xlabel("src")
-        plt.ylabel("Flow count")
-        plt.title("Top 10 source IPs")
-        fig2.tight_layout()
-        buf2 = io.BytesIO()
-        fig2.savefig(buf2, format="png", bbox_inches="tight")
-        plt.close(fig2)
-        buf2.seek(0)
-        bar_img = base64.b64encode(buf2.getvalue()).decode("ascii")
+
+    sketches = load_host_sketches()
+
+    def chart_url(name, present):
+        if not present:
+            return None
+        # the version query arg changes with the data, so stale PNGs are never reused
+        return url_for("stats_chart", name=name, v=views["version"])
 
     return render_template_string(
         STATS_TEMPLATE,
-        total_flows=total,
-        num_anomalies=num_anom,
+        total_flows=views["total"],
+        num_anomalies=views["num_anomalies"],
         score_mean=score_mean,
         score_min=score_min,
         score_max=score_max,
-        hist_img=hist_img,
-        bar_img=bar_img,
+        hist_url=chart_url("score_hist", summary is not None),
+        bar_url=chart_url("top_src", views["top_src"] is not None),
+        trend_url=chart_url("trend", views.get("trend") is not None and not views["trend"].empty),
+        sketches=sketches,
+        top_talkers=sketches["hosts"][:10] if sketches else [],
+        fanout=sorted(
+            sketches["hosts"], key=lambda h: h["distinct_dport"], reverse=True
+        )[:10] if sketches else [],
+    )
+
+
+@app.route("/stats/chart/<name>.png")
+def stats_chart(name):
+    if name not in CHARTS:
+        abort(404)
+    if not SCORED_PATH.exists():
+        abort(404)
+
+    try:
+        views = stats_views()
+    except Exception as e:
+        return f"Failed to read scored data: {e}", 500
+
+    png = get_chart(views, name)
+    if png is None:
+        abort(404)
+
+    resp = Response(png, mimetype="image/png")
+    resp.set_etag(f"{name}-{views['version']}")
+    resp.last_modified = views["last_modified"]
+    resp.cache_control.public = True
+    resp.cache_control.no_cache = True  # always revalidate; 304 when unchanged
+    return resp.make_conditional(request)
+
+
+@app.route("/stats/rollups.json")
+def stats_rollups():
+    """
+    Rollup rows for trend charts:
+    ?granularity=minute|hour&since=<epoch>&until=<epoch>&host=<ip>&role=src|dst
+    """
+    granularity = request.args.get("granularity", "minute")
+    if granularity not in ROLLUP_GRANULARITIES:
+        return f"granularity must be one of {list(ROLLUP_GRANULARITIES)}", 400
+    role = request.args.get("role", "src")
+    if role not in ("src", "dst"):
+        return "role must be 'src' or 'dst'", 400
+    try:
+        since = int(request.args.get("since", 0))
+        until = int(request.args.get("until", 2**62))
+    except ValueError:
+        return "since/until must be integer epoch seconds", 400
+    if load_rollups() is None:
+        return "No rollups found in data/scored.db. Re-score features that include ts_start.", 404
+
+    import pandas as pd
+
+    host = request.args.get("host")
+    if host:
+        sql = (
+            "SELECT bucket, flows, anomalies FROM rollup_hosts "
+            "WHERE granularity = ? AND role = ? AND host = ? AND bucket BETWEEN ? AND ? "
+            "ORDER BY bucket"
+        )
+        params = [granularity, role, host, since, until]
+    else:
+        sql = (
+            "SELECT bucket, flows, anomalies, score_min, score_max, score_sum "
+            "FROM rollup_flows WHERE granularity = ? AND bucket BETWEEN ? AND ? "
+            "ORDER BY bucket"
+        )
+        params = [granularity, since, until]
+
+    con = _open_flow_store()
+    try:
+        rows = pd.read_sql_query(sql, con, params=params)
+    finally:
+        con.close()
+    return Response(
+        f'{{"granularity": "{granularity}", "buckets": {rows.to_json(orient="records")}}}',
+        mimetype="application/json",
     )
 
 
+# --- Metrics -------------------------------------------------------------------
+
+REQUEST_SECONDS = metrics.REGISTRY.histogram(
+    "ath_http_request_duration_seconds", "Dashboard request latency by route"
+)
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _observe_latency(response):
+    started = g.get("request_started")
+    if started is not None:
+        # label by the route pattern, not the URL, so /stats/chart/<name>.png
+        # stays one series; streamed bodies are timed up to the first byte
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            route=route, method=request.method, status=response.status_code,
+        )
+    return response
+
+
+# Under dashboard.serve each worker has its own registry, and successive
+# scrapes land on different workers. So every worker also snapshots its
+# registry to WORKER_METRICS_DIR/<pid>.json every WORKER_METRICS_SECONDS, and
+# /metrics serves all of those labelled by worker: each series then only ever
+# comes from one process and never goes backwards. serve.py removes a
+# worker's file when the worker exits.
+WORKER_METRICS_DIR = metrics.METRICS_DIR / "workers"
+WORKER_METRICS_SECONDS = 2.0
+_worker_metrics = {"path": None}
+
+
+def _worker_metrics_loop() -> None:
+    while True:
+        time.sleep(WORKER_METRICS_SECONDS)
+        try:
+            metrics.write_snapshot(_worker_metrics["path"])
+        except OSError:
+            pass
+
+
+def enable_worker_metrics() -> None:
+    """Called by dashboard/serve.py in each forked worker."""
+    _worker_metrics["path"] = WORKER_METRICS_DIR / f"{os.getpid()}.json"
+    metrics.write_snapshot(_worker_metrics["path"])
+    threading.Thread(target=_worker_metrics_loop, daemon=True).start()
+
+
+def _read_snapshots(directory: Path, label: str) -> list:
+    snapshots = []
+    for path in sorted(directory.glob("*.json")):
+        try:
+            snapshots.append(({label: path.stem}, json.loads(path.read_text())))
+        except (OSError, ValueError):
+            continue  # being replaced or half-written; pick it up next scrape
+    return snapshots
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """
+    Prometheus text format: the dashboard's live registry (every worker's,
+    under dashboard.serve) plus the snapshot each batch job (extract, train,
+    score, pipeline) left in METRICS_DIR.
+    """
+    if _worker_metrics["path"] is None:
+        snapshots = [({}, metrics.REGISTRY.snapshot())]
+    else:
+        metrics.write_snapshot(_worker_metrics["path"])  # our own, up to date
+        snapshots = _read_snapshots(WORKER_METRICS_DIR, "worker")
+    snapshots += _read_snapshots(metrics.METRICS_DIR, "job")
+    return Response(metrics.render_prometheus(snapshots), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/live-capture")
 def live_capture():
     """
@@ -808,46 +1821,23 @@ def stop_capture():
         pass
 
     pcap_path = DATA_DIR / "live_capture.pcap"
-    csv_path = DATA_DIR / "features.csv"
-    model_path = MODELS_DIR / "model.pkl"
 
     if not pcap_path.exists():
         return "No live_capture.pcap found after stopping capture.", 404
 
-    extract_cmd = [
-        "python",
-        "feature_extractor/extract.py",
-        "--pcap", str(pcap_path),
-        "--out", str(csv_path),
-    ]
-    train_cmd = [
-        "python",
-        "models/train.py",
-        "--csv", str(csv_path),
-        "--model", str(model_path),
-    ]
-
-    try:
-        subprocess.run(extract_cmd, check=True, capture_output=True, text=True)
-    except subprocess.CalledProcessError as e:
-        return (
-            f"Feature extraction from live_capture.pcap failed (exit {e.returncode})."
-            f"<pre>{e.stderr}</pre>",
-            500,
-        )
-
     try:
-        subprocess.run(train_cmd, check=True, capture_output=True, text=True)
+        run_pipeline("--pcap", str(pcap_path))
     except subprocess.CalledProcessError as e:
         return (
-            f"Model training on live capture features failed (exit {e.returncode})."
+            f"Pipeline on live_capture.pcap failed (exit {e.returncode})."
             f"<pre>{e.stderr}</pre>",
             500,
         )
 
-    return "Capture stopped, features extracted, and model retrained. <a href='/'>Back to dashboard</a>"
+    return "Capture stopped, features extracted, model retrained and flows scored. <a href='/'>Back to dashboard</a>"
 
 
 if __name__ == "__main__":
-    # For anything beyond pure local dev, it's safer not to expose debug info
+    # Single-process dev server; use `python -m dashboard.serve` for several
+    # workers. For anything beyond pure local dev, it's safer not to expose debug info
     app.run(host="0.0.0.0", port=5000, debug=False)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Multi-worker serving mode for the dashboard.
+
+The master process binds the port, builds the read-only caches once
+(app.warm_caches(): scored.csv views, rollups, chart PNGs) and then forks
+--workers processes that all accept on the shared socket. Workers inherit
+the caches copy-on-write, so N workers hold about one copy of the data
+rather than N, and none of them pays the cold-cache parse on its first
+request. Each worker is a threaded Werkzeug server, so slow downloads and
+the live-feed stream don't block other requests in that worker.
+
+  python -m dashboard.serve --workers 4 --port 5000
+
+The master restarts workers that die. When data/scored.csv or scored.db
+changes (checked every --watch seconds), or on SIGHUP, it rebuilds the
+caches and replaces the workers one at a time so the new data is shared
+again. SIGTERM/SIGINT stop all workers, letting in-flight requests finish
+for up to --graceful-timeout seconds.
+
+Each worker keeps its own metrics registry and snapshots it to
+data/metrics/workers/<pid>.json; /metrics on any worker serves all of them
+with a worker label.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+try:
+    from dashboard import app as dashboard
+except ImportError:  # run as dashboard/serve.py
+    import app as dashboard
+
+
+class WorkerRequestHandler(WSGIRequestHandler):
+    def setup(self):
+        # the listening socket is non-blocking; on some platforms accepted
+        # connections inherit that, and the handler expects blocking reads
+        self.request.setblocking(True)
+        super().setup()
+
+
+class QuietRequestHandler(WorkerRequestHandler):
+    """Skips the per-request access log line, which costs more than a cached page."""
+
+    def log_request(self, code="-", size="-"):
+        pass
+
+
+def bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    # every worker's selector wakes for each connection; the ones that lose
+    # the race must get EAGAIN (which socketserver ignores) rather than block
+    # in accept(), where they would never notice server.shutdown()
+    sock.setblocking(False)
+    sock.set_inheritable(True)
+    return sock
+
+
+def data_key():
+    """Changes whenever score.py rewrites scored.csv or scored.db."""
+    return tuple(
+        dashboard._scored_key(p) if p.exists() else None
+        for p in (dashboard.SCORED_PATH, dashboard.FLOWS_DB_PATH)
+    )
+
+
+def warm() -> None:
+    start = time.perf_counter()
+    gc.unfreeze()  # let the previous generation's caches be collected
+    try:
+        dashboard.warm_caches()
+    except Exception as e:  # serve anyway; requests report the error themselves
+        print(f"[warn] cache warm-up failed: {e}")
+        return
+    # move everything built so far out of the collector's reach: a GC pass in
+    # a worker would otherwise touch (and so copy) every shared object
+    gc.collect()
+    gc.freeze()
+    print(f"[ok] caches warmed in {time.perf_counter() - start:.2f}s")
+
+
+def run_worker(sock: socket.socket, args) -> None:
+    handler = WorkerRequestHandler if args.access_log else QuietRequestHandler
+    server = make_server(
+        args.host, args.port, dashboard.app, threaded=True,
+        request_handler=handler, fd=sock.fileno(),
+    )
+
+    def stop(*_):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the master decides when to stop
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    dashboard.enable_worker_metrics()
+    idle_threads = threading.active_count()
+    server.serve_forever()
+
+    # serve_forever() only stops accepting; give running requests a moment
+    deadline = time.monotonic() + args.graceful_timeout
+    while threading.active_count() > idle_threads and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+class Master:
+    def __init__(self, sock: socket.socket, args):
+        self.sock = sock
+        self.args = args
+        self.workers = {}  # pid -> generation
+        self.generation = 0
+        self.stopping = False
+        self.reload = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.sock, self.args)
+            except BaseException as e:
+                print(f"[err] worker {os.getpid()} crashed: {e!r}", file=sys.stderr)
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = self.generation
+
+    def forget(self, pid: int) -> None:
+        self.workers.pop(pid, None)
+        (dashboard.WORKER_METRICS_DIR / f"{pid}.json").unlink(missing_ok=True)
+
+    def stop_workers(self, pids) -> None:
+        """SIGTERM `pids`, wait for them to drain, then SIGKILL whatever is left."""
+        pids = set(pids)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.args.graceful_timeout + 1.0
+        while pids and time.monotonic() < deadline:
+            for pid in list(pids):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    pids.discard(pid)
+                    self.forget(pid)
+            time.sleep(0.05)
+        for pid in pids:
+            print(f"[warn] worker {pid} did not stop in time; killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self.forget(pid)
+
+    def reap(self) -> None:
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if pid == 0:
+                return
+            gen = self.workers.get(pid)
+            self.forget(pid)
+            if gen == self.generation and not self.stopping:
+                print(f"[warn] worker {pid} exited ({os.waitstatus_to_exitcode(status)}); restarting")
+
+    def current(self) -> int:
+        return sum(1 for g in self.workers.values() if g == self.generation)
+
+    def roll(self) -> None:
+        """Re-warm the caches, then swap workers one by one for fresh forks."""
+        warm()
+        self.generation += 1
+        for pid, gen in list(self.workers.items()):
+            if gen == self.generation:
+                continue
+            self.spawn()
+            self.stop_workers([pid])
+        print(f"[ok] workers replaced ({self.current()} serving)")
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_hup)
+
+        key = data_key()
+        next_check = time.monotonic() + self.args.watch
+        while not self.stopping:
+            self.reap()
+            while self.current() < self.args.workers and not self.stopping:
+                self.spawn()
+            if self.args.watch and time.monotonic() >= next_check:
+                next_check = time.monotonic() + self.args.watch
+                new_key = data_key()
+                if new_key != key:
+                    key = new_key
+                    self.reload = True
+            if self.reload:
+                self.reload = False
+                self.roll()
+            time.sleep(0.2)
+
+        self.stop_workers(list(self.workers))
+        self.workers.clear()
+
+    def _on_stop(self, *_):
+        self.stopping = True
+
+    def _on_hup(self, *_):
+        self.reload = True
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Serve the dashboard with preforked workers")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=5000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Worker processes (default: CPU count)")
+    ap.add_argument("--backlog", type=int, default=1024, help="Listen queue length")
+    ap.add_argument("--watch", type=float, default=5.0,
+                    help="Seconds between checks for new scored data (0 = only on SIGHUP)")
+    ap.add_argument("--graceful-timeout", type=float, default=5.0,
+                    help="Seconds a stopping worker waits for in-flight requests")
+    ap.add_argument("--access-log", action="store_true", help="Log every request (off by default)")
+    args = ap.parse_args()
+
+    if args.workers < 1:
+        raise SystemExit("[err] --workers must be at least 1")
+
+    try:
+        sock = bind(args.host, args.port, args.backlog)
+    except OSError as e:
+        raise SystemExit(f"[err] cannot listen on {args.host}:{args.port}: {e}")
+
+    for stale in dashboard.WORKER_METRICS_DIR.glob("*.json"):  # from an earlier run
+        stale.unlink(missing_ok=True)
+    warm()
+    print(f"[ok] serving on http://{args.host}:{args.port} with {args.workers} workers (master pid {os.getpid()})")
+    try:
+        Master(sock, args).run()
+    finally:
+        sock.close()
+    print("[ok] stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,42 @@
 Improved feature extractor for network hunting demo.
 If no PCAP is provided, generates demo rows.
 """
-import argparse, math
+import argparse, json, math, sys, time
 from pathlib import Path
 import pandas as pd
 import numpy as np
 
 try:
-    from scapy.all import rdpcap, IP, TCP, UDP, Raw
-except Exception as e:
-    rdpcap = None
-    IP = TCP = UDP = Raw = object
-    print("[warn] scapy not available:", e)
+    from feature_extractor.sketches import HostSketches
+    from feature_extractor.windows import SlidingWindowAggregator
+except ImportError:  # run as a script: feature_extractor/ is on sys.path
+    from sketches import HostSketches
+    from windows import SlidingWindowAggregator
+
+try:
+    import metrics
+except ImportError:  # run as a script: put the repo root on sys.path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    import metrics
+
+_scapy = {}
+
+def load_scapy():
+    """
+    Import scapy on first use: only the --pcap path needs it, and
+    `scapy.all` alone takes most of a second. It has to be `scapy.all`:
+    payload_entropy is computed over the Raw layer, so which application
+    dissectors (DNS, ...) are registered changes the feature.
+    Returns (rdpcap, IP, TCP, UDP, Raw), or None if scapy is unavailable.
+    """
+    if "mods" not in _scapy:
+        try:
+            from scapy.all import rdpcap, IP, TCP, UDP, Raw
+            _scapy["mods"] = (rdpcap, IP, TCP, UDP, Raw)
+        except Exception as e:
+            print("[warn] scapy not available:", e)
+            _scapy["mods"] = None
+    return _scapy["mods"]
 
 def entropy_bytes(b: bytes) -> float:
     if not b:
@@ -24,79 +49,282 @@ def entropy_bytes(b: bytes) -> float:
     probs = [c / len(b) for c in counts.values()]
     return -sum(p * math.log2(p) for p in probs if p > 0)
 
-def demo_features():
+def demo_features(bidirectional: bool = False):
+    """
+    Two directions of one HTTP exchange, for runs without a capture; with
+    `bidirectional`, the same exchange as one conversation row.
+    """
+    if bidirectional:
+        return pd.DataFrame([
+            {"src":"10.0.0.1","dst":"10.0.0.2","sport":1234,"dport":80,"proto":6,
+             "ts_start":1700000000.0,"handshake_failed":0,"pkt_count":18,"bytes":2400,"duration_ms":120,
+             "avg_pkt_size":133.33,"iat_mean_ms":7.06,"iat_std_ms":4.1,"payload_entropy":3.3,
+             "fwd_pkts":10,"bwd_pkts":8,"fwd_bytes":1500,"bwd_bytes":900,
+             "fwd_iat_mean_ms":13,"fwd_iat_std_ms":3,"bwd_iat_mean_ms":12,"bwd_iat_std_ms":2.5},
+        ])
     return pd.DataFrame([
         {"src":"10.0.0.1","dst":"10.0.0.2","sport":1234,"dport":80,"proto":6,
-         "pkt_count":10,"bytes":1500,"duration_ms":120,"avg_pkt_size":150,
+         "ts_start":1700000000.0,"handshake_failed":0,"pkt_count":10,"bytes":1500,"duration_ms":120,"avg_pkt_size":150,
          "iat_mean_ms":13,"iat_std_ms":3,"payload_entropy":3.2},
         {"src":"10.0.0.2","dst":"10.0.0.1","sport":80,"dport":1234,"proto":6,
-         "pkt_count":8,"bytes":900,"duration_ms":95,"avg_pkt_size":112.5,
+         "ts_start":1700000000.004,"handshake_failed":0,"pkt_count":8,"bytes":900,"duration_ms":95,"avg_pkt_size":112.5,
          "iat_mean_ms":12,"iat_std_ms":2.5,"payload_entropy":2.8},
     ])
 
-def extract_from_pcap(pcap_path: Path) -> pd.DataFrame:
-    if rdpcap is None:
-        return demo_features()
-    pkts = rdpcap(str(pcap_path))
-    if not pkts:
-        return demo_features()
+# Per-source estimates from the bounded-memory sketches, joined onto each flow.
+HOST_FEATURES = ["src_flows_est", "src_distinct_dst_est", "src_distinct_dport_est"]
+
+def add_host_features(df: pd.DataFrame, sketches: HostSketches = None):
+    """
+    Stream the flows through HostSketches and add HOST_FEATURES columns.
+    Hosts that fell out of the top-k count only their own flow.
+    Returns (df, sketches).
+    """
+    if sketches is None:
+        sketches = HostSketches()
+    # plain lists: iterating pandas columns element by element costs more
+    # than the sketch updates themselves
+    srcs = df["src"].tolist()
+    for src, dst, dport in zip(srcs, df["dst"].tolist(), df["dport"].tolist()):
+        sketches.add_flow(src, dst, dport)
+    stats = {src: sketches.host_stats(src) for src in set(srcs)}
+    df = df.copy()
+    df["src_flows_est"] = [max(stats[s]["flows"], 1) for s in srcs]
+    df["src_distinct_dst_est"] = [max(stats[s]["distinct_dst"], 1.0) for s in srcs]
+    df["src_distinct_dport_est"] = [max(stats[s]["distinct_dport"], 1.0) for s in srcs]
+    return df, sketches
+
+# Per-source behaviour over the last N seconds, joined onto each flow.
+WINDOW_FEATURES = ["src_win_flow_rate", "src_win_byte_rate", "src_win_distinct_dst", "src_win_failed_ratio"]
+
+def add_window_features(df: pd.DataFrame, window_s: int = 60,
+                        agg: SlidingWindowAggregator = None) -> pd.DataFrame:
+    """
+    Add WINDOW_FEATURES: each flow sees its source's activity in the
+    `window_s` seconds up to and including its own start time.
+    Pass `agg` to carry window state across successive batches.
+    Needs ts_start; returns df unchanged without it.
+    """
+    if "ts_start" not in df.columns:
+        return df
+    if agg is None:
+        agg = SlidingWindowAggregator(window_s)
+    order = df["ts_start"].to_numpy().argsort(kind="stable")
+    failed = df["handshake_failed"] if "handshake_failed" in df.columns else pd.Series(0, index=df.index)
+    rows = list(zip(df["src"], df["ts_start"], df["dst"], df["bytes"], failed))
+    out = [None] * len(rows)
+    for i in order:
+        src, ts, dst, nbytes, f = rows[i]
+        out[i] = agg.add(src, ts, dst, nbytes, int(f))
+    df = df.copy()
+    for col in WINDOW_FEATURES:
+        df[col] = [o[col] for o in out]
+    return df
+
+TCP_SYN, TCP_RST, TCP_ACK = 0x02, 0x04, 0x10
+
+# Per-direction counters added in bidirectional mode; forward is the
+# direction of the conversation's first packet (normally the initiator).
+BIDIR_FEATURES = [
+    "fwd_pkts", "bwd_pkts", "fwd_bytes", "bwd_bytes",
+    "fwd_iat_mean_ms", "fwd_iat_std_ms", "bwd_iat_mean_ms", "bwd_iat_std_ms",
+]
+
+def extract_from_pcap(pcap_path: Path, bidirectional: bool = False) -> pd.DataFrame:
+    scapy = load_scapy()
+    if scapy is None:
+        return demo_features(bidirectional)
+    started = time.perf_counter()
+    pkts = scapy[0](str(pcap_path))
+    df = extract_from_packets(pkts, started, bidirectional)
+    return df if len(df) else demo_features(bidirectional)
+
+def _new_direction() -> dict:
+    # syn/synack/rst/data: time this direction first sent a bare SYN, a
+    # SYN-ACK, a RST and a segment carrying payload (None if never)
+    return {"times": [], "bytes": 0, "payloads": [], "syn": None, "synack": None, "rst": None, "data": None}
+
+def extract_from_packets(pkts, started: float = None, bidirectional: bool = False) -> pd.DataFrame:
+    """
+    Flow rows for already-parsed scapy packets, e.g. one micro-batch of a
+    replayed capture. Empty frame if none of them are IP.
+
+    By default every direction of a conversation is its own flow. With
+    `bidirectional`, both directions share one flow-table entry under a
+    canonical key (the lower endpoint first) and come out as one row, with
+    the base features over the whole conversation plus BIDIR_FEATURES.
+    """
+    _, IP, TCP, UDP, Raw = load_scapy()
+    if started is None:
+        started = time.perf_counter()
     flows = {}
     for p in pkts:
         if IP not in p:
             continue
-        ts = float(p.time)
         ip = p[IP]
         proto = 6 if TCP in p else (17 if UDP in p else 0)
         sport = p.sport if hasattr(p, "sport") else 0
         dport = p.dport if hasattr(p, "dport") else 0
-        key = (ip.src, ip.dst, sport, dport, proto)
-        entry = flows.setdefault(key, {"times": [], "bytes": 0, "payloads": []})
-        entry["times"].append(ts)
+        if bidirectional:
+            a, b = (ip.src, sport), (ip.dst, dport)
+            key = (a, b, proto) if a <= b else (b, a, proto)
+            conv = flows.get(key)
+            if conv is None:
+                conv = flows[key] = ((ip.src, ip.dst, sport, dport, proto), _new_direction(), _new_direction())
+            entry = conv[1] if a == (conv[0][0], conv[0][2]) else conv[2]
+        else:
+            entry = flows.get((ip.src, ip.dst, sport, dport, proto))
+            if entry is None:
+                entry = flows[(ip.src, ip.dst, sport, dport, proto)] = _new_direction()
+        t = float(p.time)
+        entry["times"].append(t)
         entry["bytes"] += len(p)
+        if proto == 6:
+            tcp = p[TCP]
+            flags = int(tcp.flags)
+            if flags & TCP_SYN:
+                mark = "synack" if flags & TCP_ACK else "syn"
+                if entry[mark] is None:
+                    entry[mark] = t
+            if flags & TCP_RST and entry["rst"] is None:
+                entry["rst"] = t
+            if entry["data"] is None and len(tcp.payload):
+                entry["data"] = t
         if Raw in p:
             entry["payloads"].append(bytes(p[Raw].load))
+    metrics.REGISTRY.gauge("ath_extract_flow_table_size", "Flows held in the extraction flow table").set(len(flows))
+    rows = _bidirectional_rows(flows) if bidirectional else _directed_rows(flows)
+    _record_extract_rates(len(pkts), len(rows), time.perf_counter() - started)
+    return pd.DataFrame(rows)
+
+def _timing(times: list) -> tuple:
+    """(sorted times, duration_ms, iat_mean_ms, iat_std_ms) for one flow or direction."""
+    times = sorted(times)
+    if len(times) < 2:
+        return times, 0.0, 0.0, 0.0
+    iats = np.diff(times) * 1000
+    return times, (times[-1] - times[0]) * 1000, float(np.mean(iats)), float(np.std(iats, ddof=0))
+
+def _first(*times):
+    times = [t for t in times if t is not None]
+    return min(times) if times else None
+
+def _handshake_failed(e: dict, reply: dict) -> int:
+    """
+    1 if direction `e` opened a connection (bare SYN) that failed: the peer
+    never SYN-ACKed, or a RST from either side came before any payload. A
+    RST after data is an ordinary abortive close and does not count.
+    """
+    if e["syn"] is None:
+        return 0
+    if reply["synack"] is None:
+        return 1
+    rst = _first(e["rst"], reply["rst"])
+    data = _first(e["data"], reply["data"])
+    return int(rst is not None and (data is None or rst <= data))
+
+def _directed_rows(flows: dict) -> list:
     rows = []
     for (src,dst,sport,dport,proto), e in flows.items():
-        times = sorted(e["times"])
+        times, duration_ms, iat_mean_ms, iat_std_ms = _timing(e["times"])
         pkt_count = len(times)
-        duration_ms = (times[-1]-times[0])*1000 if pkt_count > 1 else 0.0
-        iats = [(times[i+1]-times[i])*1000 for i in range(len(times)-1)] if pkt_count>1 else [0.0]
-        iat_mean_ms = float(np.mean(iats)) if iats else 0.0
-        iat_std_ms = float(np.std(iats, ddof=0)) if iats else 0.0
-        avg_pkt_size = e["bytes"] / pkt_count if pkt_count else 0.0
-        payload = b"".join(e["payloads"])
-        payload_entropy = entropy_bytes(payload)
+        reply = flows.get((dst, src, dport, sport, proto)) or _new_direction()
         rows.append({
             "src": src,
             "dst": dst,
             "sport": sport,
             "dport": dport,
             "proto": proto,
+            "ts_start": times[0],
+            "handshake_failed": _handshake_failed(e, reply),
             "pkt_count": pkt_count,
             "bytes": e["bytes"],
             "duration_ms": duration_ms,
-            "avg_pkt_size": avg_pkt_size,
+            "avg_pkt_size": e["bytes"] / pkt_count if pkt_count else 0.0,
             "iat_mean_ms": iat_mean_ms,
             "iat_std_ms": iat_std_ms,
-            "payload_entropy": payload_entropy,
+            "payload_entropy": entropy_bytes(b"".join(e["payloads"])),
         })
-    return pd.DataFrame(rows) if rows else demo_features()
+    return rows
+
+def _bidirectional_rows(flows: dict) -> list:
+    rows = []
+    for (src,dst,sport,dport,proto), fwd, bwd in flows.values():
+        times, duration_ms, iat_mean_ms, iat_std_ms = _timing(fwd["times"] + bwd["times"])
+        _, _, fwd_iat_mean, fwd_iat_std = _timing(fwd["times"])
+        _, _, bwd_iat_mean, bwd_iat_std = _timing(bwd["times"])
+        pkt_count = len(times)
+        nbytes = fwd["bytes"] + bwd["bytes"]
+        rows.append({
+            "src": src,
+            "dst": dst,
+            "sport": sport,
+            "dport": dport,
+            "proto": proto,
+            "ts_start": times[0],
+            "handshake_failed": _handshake_failed(fwd, bwd),
+            "pkt_count": pkt_count,
+            "bytes": nbytes,
+            "duration_ms": duration_ms,
+            "avg_pkt_size": nbytes / pkt_count,
+            "iat_mean_ms": iat_mean_ms,
+            "iat_std_ms": iat_std_ms,
+            "payload_entropy": entropy_bytes(b"".join(fwd["payloads"] + bwd["payloads"])),
+            "fwd_pkts": len(fwd["times"]),
+            "bwd_pkts": len(bwd["times"]),
+            "fwd_bytes": fwd["bytes"],
+            "bwd_bytes": bwd["bytes"],
+            "fwd_iat_mean_ms": fwd_iat_mean,
+            "fwd_iat_std_ms": fwd_iat_std,
+            "bwd_iat_mean_ms": bwd_iat_mean,
+            "bwd_iat_std_ms": bwd_iat_std,
+        })
+    return rows
+
+def _record_extract_rates(n_pkts: int, n_flows: int, elapsed: float) -> None:
+    reg = metrics.REGISTRY
+    reg.counter("ath_extract_packets_total", "Packets read by the extractor").inc(n_pkts)
+    reg.counter("ath_extract_flows_total", "Flows emitted by the extractor").inc(n_flows)
+    if elapsed > 0:
+        reg.gauge("ath_extract_packets_per_second", "Packet throughput of the last extraction").set(n_pkts / elapsed)
+        reg.gauge("ath_extract_flows_per_second", "Flow throughput of the last extraction").set(n_flows / elapsed)
+
+def build_features(pcap=None, window_s: int = 60, bidirectional: bool = False):
+    """
+    Full feature frame for a pcap (or the demo rows): base flow features plus
+    per-host sketch and sliding-window features. Returns (df, sketches).
+    """
+    df = extract_from_pcap(Path(pcap), bidirectional) if pcap else demo_features(bidirectional)
+    df, sketches = add_host_features(df)
+    df = add_window_features(df, window_s)
+    return df, sketches
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--pcap", type=str, default="", help="Path to pcap/pcapng")
     ap.add_argument("--out", type=str, default="data/features.csv", help="Output CSV path")
+    ap.add_argument("--window", type=int, default=60,
+                    help="Sliding window (seconds) for per-source behaviour features")
+    ap.add_argument("--sketch-out", type=str, default="",
+                    help="Also write the top-talker sketch summary JSON here")
+    ap.add_argument("--bidirectional", action="store_true",
+                    help="One row per conversation (both directions) with forward/backward counters")
     args = ap.parse_args()
 
     out = Path(args.out)
     out.parent.mkdir(parents=True, exist_ok=True)
 
-    if args.pcap:
-        df = extract_from_pcap(Path(args.pcap))
-    else:
-        df = demo_features()
-    df.to_csv(out, index=False)
-    print(f"[ok] wrote {len(df)} rows to {out}")
+    with metrics.job("extract"):
+        with metrics.stage("extract"):
+            df, sketches = build_features(args.pcap or None, args.window, args.bidirectional)
+        df.to_csv(out, index=False)
+        print(f"[ok] wrote {len(df)} rows to {out}")
+
+        if args.sketch_out:
+            sketch_out = Path(args.sketch_out)
+            sketch_out.parent.mkdir(parents=True, exist_ok=True)
+            sketch_out.write_text(json.dumps(sketches.summary(), indent=2))
+            print(f"[ok] wrote host sketches to {sketch_out}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
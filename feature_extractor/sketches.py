@@ -0,0 +1,155 @@
+"""
+Bounded-memory streaming sketches for per-host traffic features.
+
+- SpaceSaving keeps the k heaviest sources (top talkers) with an error bound.
+- HyperLogLog estimates distinct counts (dst IPs, dports) in 2**p registers.
+
+HostSketches ties the two together: each Space-Saving slot carries two HLLs,
+so memory is k * 2 * 2**p bytes no matter how many flows or hosts are seen.
+A host evicted from the top-k loses its HLLs; the newcomer starts fresh.
+"""
+import hashlib
+import heapq
+import math
+
+
+def _hash64(value) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2**p one-byte registers."""
+
+    def __init__(self, p: int = 10):
+        if not 4 <= p <= 16:
+            raise ValueError("p must be between 4 and 16")
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value) -> None:
+        h = _hash64(value)
+        idx = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def clear(self) -> None:
+        self.registers[:] = bytes(self.m)
+
+    def estimate(self) -> float:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # linear counting for small cardinalities
+        return raw
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter counter over at most k keys.
+
+    Counts never underestimate; a key's overestimate is at most its `error`.
+
+    The minimum is found through a heap of (count, seq, key) entries. An
+    increment pushes a new entry instead of updating the old one in place;
+    entries whose count no longer matches are skipped when popped, and the
+    heap is rebuilt once stale entries outnumber live ones. Updates and
+    evictions are O(log k) amortized.
+    """
+
+    def __init__(self, k: int = 256):
+        self.k = k
+        self.counts = {}  # key -> [count, error]
+        self._heap = []
+        self._seq = 0  # tie-break so keys never get compared
+
+    def _push(self, key, count) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (count, self._seq, key))
+        if len(self._heap) > 4 * self.k + 64:
+            self._heap = [(c, i, key) for i, (key, (c, _)) in enumerate(self.counts.items())]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while True:
+            count, _, key = heapq.heappop(self._heap)
+            slot = self.counts.get(key)
+            if slot is not None and slot[0] == count:
+                return key
+
+    def add(self, key, weight: int = 1):
+        """Count `key`. Returns the evicted key, if any."""
+        slot = self.counts.get(key)
+        if slot is not None:
+            slot[0] += weight
+            self._push(key, slot[0])
+            return None
+        victim = None
+        floor = 0
+        if len(self.counts) >= self.k:
+            victim = self._pop_min()
+            floor = self.counts.pop(victim)[0]
+        self.counts[key] = [floor + weight, floor]
+        self._push(key, floor + weight)
+        return victim
+
+    def top(self, n=None):
+        items = sorted(self.counts.items(), key=lambda kv: kv[1][0], reverse=True)
+        return [(key, c, e) for key, (c, e) in items[:n]]
+
+
+class HostSketches:
+    """Top source hosts with distinct dst / dport estimates, in fixed memory."""
+
+    def __init__(self, k: int = 256, p: int = 10):
+        self.k = k
+        self.p = p
+        self.talkers = SpaceSaving(k)
+        self.fanout = {}  # src -> (HLL of dst, HLL of dport)
+        self.flows_seen = 0
+
+    def add_flow(self, src, dst, dport) -> None:
+        self.flows_seen += 1
+        evicted = self.talkers.add(src)
+        hlls = self.fanout.get(src)
+        if hlls is None:
+            if evicted is not None:
+                # hand the evicted host's registers to the newcomer
+                hlls = self.fanout.pop(evicted)
+                hlls[0].clear()
+                hlls[1].clear()
+            else:
+                hlls = (HyperLogLog(self.p), HyperLogLog(self.p))
+            self.fanout[src] = hlls
+        hlls[0].add(dst)
+        hlls[1].add(dport)
+
+    def host_stats(self, src) -> dict:
+        """Estimates for `src`; all zero if it is not currently tracked."""
+        slot = self.talkers.counts.get(src)
+        if slot is None:
+            return {"flows": 0, "error": 0, "distinct_dst": 0.0, "distinct_dport": 0.0}
+        dst_hll, dport_hll = self.fanout[src]
+        return {
+            "flows": slot[0],
+            "error": slot[1],
+            "distinct_dst": round(dst_hll.estimate(), 1),
+            "distinct_dport": round(dport_hll.estimate(), 1),
+        }
+
+    def summary(self) -> dict:
+        return {
+            "k": self.k,
+            "hll_precision": self.p,
+            "flows_seen": self.flows_seen,
+            "hosts": [
+                {"host": host, **self.host_stats(host)}
+                for host, _, _ in self.talkers.top()
+            ],
+        }
@@ -0,0 +1,121 @@
+"""
+Incremental sliding-window behaviour features per source host.
+
+Each host gets a ring buffer of one-second slots covering the last N seconds.
+Adding a flow touches one slot plus the slots that expired since the host was
+last seen, so updates are O(1) amortized and never rescan the window.
+Windowed totals (flows, bytes, failed handshakes, distinct dsts) are kept
+alongside the ring so reading them is O(1) too.
+"""
+
+
+class HostWindow:
+    __slots__ = (
+        "n", "secs", "slot_flows", "slot_bytes", "slot_failed", "slot_dsts",
+        "flows", "bytes", "failed", "dst_counts", "last_sec",
+    )
+
+    def __init__(self, n: int):
+        self.n = n
+        self.secs = [-1] * n
+        self.slot_flows = [0] * n
+        self.slot_bytes = [0] * n
+        self.slot_failed = [0] * n
+        self.slot_dsts = [None] * n
+        self.flows = 0
+        self.bytes = 0
+        self.failed = 0
+        self.dst_counts = {}
+        self.last_sec = None
+
+    def _expire(self, i: int) -> None:
+        self.flows -= self.slot_flows[i]
+        self.bytes -= self.slot_bytes[i]
+        self.failed -= self.slot_failed[i]
+        dsts = self.slot_dsts[i]
+        if dsts:
+            counts = self.dst_counts
+            for dst, c in dsts.items():
+                left = counts[dst] - c
+                if left:
+                    counts[dst] = left
+                else:
+                    del counts[dst]
+        self.secs[i] = -1
+        self.slot_flows[i] = self.slot_bytes[i] = self.slot_failed[i] = 0
+        self.slot_dsts[i] = None
+
+    def advance(self, sec: int) -> None:
+        """Expire every slot that falls out of the window ending at `sec`."""
+        if self.last_sec is None:
+            self.last_sec = sec
+            return
+        if sec <= self.last_sec:
+            return
+        if sec - self.last_sec >= self.n:
+            # idle for a whole window: everything expires
+            stale = range(self.n)
+        else:
+            # slot s % n still holds second s - n, which just left the window
+            stale = (s % self.n for s in range(self.last_sec + 1, sec + 1))
+        for i in stale:
+            if self.secs[i] != -1:
+                self._expire(i)
+        self.last_sec = sec
+
+    def add(self, sec: int, dst, nbytes: int, failed: int) -> None:
+        self.advance(sec)
+        sec = max(sec, self.last_sec)  # late arrivals count in the newest slot
+        i = sec % self.n
+        self.secs[i] = sec
+        self.slot_flows[i] += 1
+        self.slot_bytes[i] += nbytes
+        self.slot_failed[i] += failed
+        if self.slot_dsts[i] is None:
+            self.slot_dsts[i] = {}
+        self.slot_dsts[i][dst] = self.slot_dsts[i].get(dst, 0) + 1
+        self.dst_counts[dst] = self.dst_counts.get(dst, 0) + 1
+        self.flows += 1
+        self.bytes += nbytes
+        self.failed += failed
+
+
+class SlidingWindowAggregator:
+    """
+    Per-source sliding-window aggregates over the last `window_s` seconds.
+
+    Feed flows in start-time order with add(); each call returns the window
+    features for that source including the flow just added.
+    """
+
+    def __init__(self, window_s: int = 60):
+        if window_s < 1:
+            raise ValueError("window_s must be >= 1")
+        self.window_s = window_s
+        self.hosts = {}
+        self._next_sweep = None
+
+    def _sweep(self, sec: int) -> None:
+        # drop hosts idle for a whole window so memory tracks active hosts only
+        idle = [h for h, w in self.hosts.items() if w.last_sec < sec - self.window_s]
+        for h in idle:
+            del self.hosts[h]
+
+    def add(self, src, ts: float, dst, nbytes: int, failed: int = 0) -> dict:
+        sec = int(ts)
+        if self._next_sweep is None:
+            self._next_sweep = sec + self.window_s
+        elif sec >= self._next_sweep:
+            self._sweep(sec)
+            self._next_sweep = sec + self.window_s
+
+        w = self.hosts.get(src)
+        if w is None:
+            w = self.hosts[src] = HostWindow(self.window_s)
+        w.add(sec, dst, nbytes, failed)
+        return {
+            "src_win_flow_rate": w.flows / self.window_s,
+            "src_win_byte_rate": w.bytes / self.window_s,
+            "src_win_distinct_dst": len(w.dst_counts),
+            "src_win_failed_ratio": w.failed / w.flows,
+        }
@@ -0,0 +1,210 @@
+"""
+Lightweight instrumentation shared by the pipeline stages and the dashboard.
+
+Each process records into the module-level REGISTRY. Batch jobs (extract,
+train, score, pipeline) write a JSON snapshot to METRICS_DIR when they
+finish; the dashboard merges those snapshots with its own live registry and
+serves everything in Prometheus text format at /metrics. Under
+dashboard.serve each worker also snapshots its registry to
+METRICS_DIR/workers/ so any worker can serve all of them.
+
+Set ATH_PROFILE_DIR to have every job dump a cProfile file there as well.
+"""
+import cProfile
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+METRICS_DIR = Path(os.environ.get("ATH_METRICS_DIR", "data/metrics"))
+PROFILE_DIR = os.environ.get("ATH_PROFILE_DIR", "")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    """A counter, gauge or histogram with optional labels."""
+
+    def __init__(self, name: str, kind: str, help: str, buckets=None):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.buckets = tuple(buckets or DEFAULT_BUCKETS) if kind == "histogram" else None
+        self.samples = {}  # sorted label items -> value, or [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.samples[key] = self.samples.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self.samples[tuple(sorted(labels.items()))] = float(value)
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            h = self.samples.get(key)
+            if h is None:
+                h = self.samples[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    h[0][i] += 1
+            h[1] += value
+            h[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe (histogram) or set (gauge) the wall time of the block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.kind == "histogram":
+                self.observe(elapsed, **labels)
+            else:
+                self.set(elapsed, **labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = [[dict(k), v] for k, v in self.samples.items()]
+        return {"kind": self.kind, "help": self.help, "buckets": self.buckets, "samples": samples}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name, kind, help, buckets=None) -> Metric:
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = Metric(name, kind, help, buckets)
+            return m
+
+    def counter(self, name: str, help: str) -> Metric:
+        return self._get(name, "counter", help)
+
+    def gauge(self, name: str, help: str) -> Metric:
+        return self._get(name, "gauge", help)
+
+    def histogram(self, name: str, help: str, buckets=None) -> Metric:
+        return self._get(name, "histogram", help, buckets)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: m.snapshot() for m in metrics}
+
+
+REGISTRY = Registry()
+
+
+def peak_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024  # Linux reports KiB
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a pipeline stage: records its wall time and the process's peak RSS
+    so far, and prints a [time] line like the other [ok] output.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        REGISTRY.gauge("ath_stage_duration_seconds", "Wall time of the last run of each stage").set(elapsed, stage=name)
+        REGISTRY.gauge("ath_stage_peak_rss_bytes", "Process peak RSS at the end of each stage").set(peak_rss_bytes(), stage=name)
+        print(f"[time] {name:<8} {elapsed:8.3f}s")
+
+
+def write_snapshot(path: Path) -> Path:
+    """Atomically write this process's registry to `path` as JSON."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(REGISTRY.snapshot()))
+    os.replace(tmp, path)
+    return path
+
+
+def write_job_snapshot(job: str) -> Path:
+    """Persist this process's metrics for the dashboard's /metrics endpoint."""
+    REGISTRY.gauge("ath_job_last_run_timestamp_seconds", "Unix time the job last finished").set(time.time())
+    return write_snapshot(METRICS_DIR / f"{job}.json")
+
+
+@contextmanager
+def job(name: str):
+    """
+    Wrap a whole batch job: optional cProfile dump (ATH_PROFILE_DIR) and a
+    metrics snapshot on success.
+    """
+    profiler = cProfile.Profile() if PROFILE_DIR else None
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            Path(PROFILE_DIR).mkdir(parents=True, exist_ok=True)
+            out = Path(PROFILE_DIR) / f"{name}-{int(time.time())}.prof"
+            profiler.dump_stats(out)
+            print(f"[ok] wrote profile to {out}")
+    write_job_snapshot(name)
+
+
+def _fmt_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in sorted(labels.items()):
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+def render_prometheus(snapshots) -> str:
+    """
+    Render (extra labels, snapshot) pairs in the Prometheus text format.
+    Samples of the same metric from different snapshots share one HELP/TYPE.
+    """
+    merged = {}
+    for extra, snap in snapshots:
+        for name, m in snap.items():
+            entry = merged.setdefault(name, {"kind": m["kind"], "help": m["help"], "buckets": m["buckets"], "samples": []})
+            for labels, value in m["samples"]:
+                entry["samples"].append(({**labels, **extra}, value))
+
+    lines = []
+    for name in sorted(merged):
+        m = merged[name]
+        lines.append(f"# HELP {name} {m['help']}")
+        lines.append(f"# TYPE {name} {m['kind']}")
+        for labels, value in m["samples"]:
+            if m["kind"] != "histogram":
+                lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+                continue
+            counts, total, count = value
+            for bound, c in zip(m["buckets"], counts):
+                lines.append(f"{name}_bucket{_fmt_labels({**labels, 'le': _fmt_value(bound)})} {c}")
+            lines.append(f"{name}_bucket{_fmt_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
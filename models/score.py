@@ -1,8 +1,19 @@
 import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import numpy as np
 import pandas as pd
-import joblib
 from pathlib import Path
 
+try:
+    import metrics
+except ImportError:  # run as a script: put the repo root on sys.path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    import metrics
+
 
 FEATURE_COLS = [
     "pkt_count",
@@ -15,12 +26,295 @@ FEATURE_COLS = [
     "proto",
 ]
 
+# Columns the dashboard filters / sorts on: name -> (columns, partial-index WHERE).
+# Every index ends in (anomaly_score, flow_id), the /anomalies sort order, so a
+# filtered page is an index range scan with no sort step, and keyset pagination
+# ("anomaly_score, flow_id > last seen") stays bounded. The partial indexes
+# cover the default anomalies-only view (the query must say "is_anomaly = 1").
+DB_INDEXES = {
+    "idx_flows_score": ("anomaly_score, flow_id", None),
+    "idx_flows_anom_score": ("is_anomaly, anomaly_score, flow_id", None),
+    "idx_flows_src": ("src, anomaly_score, flow_id", None),
+    "idx_flows_dst": ("dst, anomaly_score, flow_id", None),
+    "idx_flows_dport": ("dport, anomaly_score, flow_id", None),
+    "idx_flows_anom_src": ("src, anomaly_score, flow_id", "is_anomaly = 1"),
+    "idx_flows_anom_dst": ("dst, anomaly_score, flow_id", "is_anomaly = 1"),
+    "idx_flows_anom_dport": ("dport, anomaly_score, flow_id", "is_anomaly = 1"),
+}
+
+# Live-feed events (dashboard /anomalies/stream). Each run diffs its anomalies
+# against the store it replaces and appends the result to scoring_events, so
+# every dashboard process reads the same event ids. The newest EVENTS_KEEP
+# events are carried over from one store to the next.
+FLOW_KEY_COLS = ["src", "dst", "sport", "dport", "proto"]
+EVENTS_KEEP = 256
+EVENT_MAX_ROWS = 200
+
+# Time-bucketed rollups keyed on the flow start time (ts_start, epoch seconds).
+ROLLUP_GRANULARITIES = {"minute": 60, "hour": 3600}
+# Fixed histogram edges so buckets from different runs stay comparable.
+# -decision_function of an IsolationForest lies roughly in [-0.5, 0.5];
+# out-of-range scores land in the first / last bin.
+SCORE_HIST_EDGES = np.linspace(-0.5, 0.5, 101)
+
+
+def compute_rollups(df: pd.DataFrame) -> dict:
+    """
+    Per-bucket flow/anomaly counts, score histograms and per-src/dst counts.
+    Returns {} when the features carry no ts_start column.
+    """
+    if "ts_start" not in df.columns:
+        return {}
+
+    score_bin = np.digitize(df["anomaly_score"].to_numpy(), SCORE_HIST_EDGES[1:-1])
+    flows, hist, hosts = [], [], []
+
+    for granularity, width in ROLLUP_GRANULARITIES.items():
+        bucket = (df["ts_start"].fillna(0) // width * width).astype("int64")
+        frame = pd.DataFrame({
+            "bucket": bucket.to_numpy(),
+            "score": df["anomaly_score"].to_numpy(),
+            "is_anomaly": df["is_anomaly"].to_numpy(),
+            "bin": score_bin,
+            "src": df["src"].to_numpy(),
+            "dst": df["dst"].to_numpy(),
+        })
+
+        f = frame.groupby("bucket").agg(
+            flows=("score", "size"),
+            anomalies=("is_anomaly", "sum"),
+            score_min=("score", "min"),
+            score_max=("score", "max"),
+            score_sum=("score", "sum"),
+        ).reset_index()
+        f.insert(0, "granularity", granularity)
+        flows.append(f)
+
+        h = frame.groupby(["bucket", "bin"]).size().rename("count").reset_index()
+        h.insert(0, "granularity", granularity)
+        hist.append(h)
+
+        for role in ("src", "dst"):
+            r = frame.groupby(["bucket", role]).agg(
+                flows=("score", "size"),
+                anomalies=("is_anomaly", "sum"),
+            ).reset_index().rename(columns={role: "host"})
+            r.insert(0, "granularity", granularity)
+            r.insert(2, "role", role)
+            hosts.append(r)
+
+    return {
+        "rollup_flows": pd.concat(flows, ignore_index=True),
+        "rollup_score_hist": pd.concat(hist, ignore_index=True),
+        "rollup_hosts": pd.concat(hosts, ignore_index=True),
+    }
+
+
+def _previous_run(db_path: Path):
+    """(run id, last event id, kept events, totals, anomaly keys) of the store at db_path, or None."""
+    if not db_path.exists():
+        return None
+    try:
+        con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        meta = dict(con.execute("SELECT key, value FROM meta").fetchall())
+        cols = {row[1] for row in con.execute("PRAGMA table_info(flows)")}
+        keys = [c for c in FLOW_KEY_COLS if c in cols]
+        anomalies = pd.read_sql_query(
+            f"SELECT {', '.join(keys) or 'flow_id'} FROM flows WHERE is_anomaly = 1", con
+        )
+        has_events = con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scoring_events'"
+        ).fetchone()
+        events = con.execute(
+            "SELECT event_id, run_id, name, data FROM scoring_events ORDER BY event_id DESC LIMIT ?",
+            (EVENTS_KEEP,),
+        ).fetchall()[::-1] if has_events else []
+    except (sqlite3.Error, pd.errors.DatabaseError):
+        return None  # not a flow store we can read; start a new event history
+    finally:
+        con.close()
+    return {
+        "run_id": int(meta.get("run_id", 0)),
+        "last_event": int(meta.get("last_event_id", 0)),
+        "events": events,
+        "total": int(meta.get("total_flows", 0)),
+        "num_anomalies": int(meta.get("num_anomalies", 0)),
+        "anomaly_keys": anomalies[keys] if keys else None,
+    }
+
+
+def scoring_events(flows: pd.DataFrame, prev: dict, run_id: int) -> list:
+    """The summary / new-anomalies / resolved events for this run, diffed against `prev`."""
+    new_anom = flows[flows["is_anomaly"] == 1]
+    seen = prev["anomaly_keys"]
+    if seen is not None and all(c in new_anom.columns for c in seen.columns):
+        keys = list(seen.columns)
+        seen = seen.drop_duplicates()
+        merged = new_anom.merge(seen, on=keys, how="left", indicator=True)
+        fresh = new_anom[(merged["_merge"] == "left_only").to_numpy()]
+        # keys flagged by the previous run that are no longer anomalous
+        merged = seen.merge(new_anom[keys].drop_duplicates(), on=keys, how="left", indicator=True)
+        resolved = seen[(merged["_merge"] == "left_only").to_numpy()]
+    else:
+        fresh = new_anom
+        resolved = new_anom.iloc[:0][[]]
+
+    events = [("summary", {
+        "run_id": run_id,
+        "total_flows": len(flows),
+        "num_anomalies": len(new_anom),
+        "delta_flows": len(flows) - prev["total"],
+        "delta_anomalies": len(new_anom) - prev["num_anomalies"],
+        "new_anomalies": len(fresh),
+        "resolved_anomalies": len(resolved),
+    })]
+    if len(fresh):
+        fresh = fresh.drop(columns=["flow_id"]).sort_values("anomaly_score", ascending=False)
+        events.append(("anomalies", {
+            "run_id": run_id,
+            "rows": json.loads(fresh.head(EVENT_MAX_ROWS).to_json(orient="records")),
+            "truncated": max(len(fresh) - EVENT_MAX_ROWS, 0),
+        }))
+    if len(resolved):
+        events.append(("resolved", {
+            "run_id": run_id,
+            "keys": json.loads(resolved.head(EVENT_MAX_ROWS).to_json(orient="records")),
+            "truncated": max(len(resolved) - EVENT_MAX_ROWS, 0),
+        }))
+    return events
+
+
+def write_flow_db(df: pd.DataFrame, db_path: Path) -> None:
+    """
+    Write scored flows, plus their time-bucketed rollups, into an indexed
+    SQLite database.
+
+    The database is built next to the target and swapped in with os.replace so
+    readers (the dashboard) never see a half-written file. When it replaces an
+    earlier store, the run's live-feed events are appended to the ones kept
+    from that store.
+    """
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    flows = df.reset_index(drop=True)
+    flows.insert(0, "flow_id", range(len(flows)))
+
+    prev = _previous_run(db_path)
+    run_id = prev["run_id"] + 1 if prev else 1
+    events = list(prev["events"]) if prev else []
+    last_event = prev["last_event"] if prev else 0
+    if prev:  # the first store has nothing to diff against
+        for name, payload in scoring_events(flows, prev, run_id):
+            last_event += 1
+            events.append((last_event, run_id, name, json.dumps(payload)))
+    events = events[-EVENTS_KEEP:]
+
+    con = sqlite3.connect(tmp_path)
+    try:
+        flows.to_sql("flows", con, index=False)
+        for name, (cols, partial) in DB_INDEXES.items():
+            where = f" WHERE {partial}" if partial else ""
+            con.execute(f"CREATE INDEX {name} ON flows ({cols}){where}")
+        con.execute("CREATE UNIQUE INDEX idx_flows_id ON flows (flow_id)")
+        # without statistics the planner prefers the is_anomaly index over the
+        # partial per-host ones and filters the whole anomaly list; a sampled
+        # ANALYZE is enough to steer it and takes milliseconds
+        con.execute("PRAGMA analysis_limit = 1000")
+        con.execute("ANALYZE flows")
+
+        meta = [
+            ("total_flows", len(flows)),
+            ("num_anomalies", int(flows["is_anomaly"].sum())),
+            ("run_id", run_id),
+            ("last_event_id", last_event),
+        ]
+        rollups = compute_rollups(flows)
+        if rollups:
+            meta += [
+                ("hist_lo", float(SCORE_HIST_EDGES[0])),
+                ("hist_hi", float(SCORE_HIST_EDGES[-1])),
+                ("hist_bins", len(SCORE_HIST_EDGES) - 1),
+            ]
+        for table, frame in rollups.items():
+            frame.to_sql(table, con, index=False)
+            con.execute(f"CREATE INDEX idx_{table} ON {table} (granularity, bucket)")
+
+        con.execute(
+            "CREATE TABLE scoring_events "
+            "(event_id INTEGER PRIMARY KEY, run_id INTEGER, name TEXT, data TEXT)"
+        )
+        con.executemany("INSERT INTO scoring_events VALUES (?, ?, ?, ?)", events)
+
+        con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value REAL)")
+        con.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", meta)
+        con.commit()
+    finally:
+        con.close()
+
+    os.replace(tmp_path, db_path)
+
+
+SCORE_BATCH_ROWS = 100_000
+
+
+def score_flows(df: pd.DataFrame, model) -> pd.DataFrame:
+    """
+    Add anomaly_score / is_anomaly to `df` and return it sorted most
+    suspicious first. Raises ValueError if model features are missing.
+    """
+    # score on whatever columns the model was fitted with (train.py adds the
+    # per-host sketch and sliding-window features when extract.py produced them)
+    feature_cols = list(getattr(model, "feature_names_in_", FEATURE_COLS))
+    missing = [c for c in feature_cols if c not in df.columns]
+    if missing:
+        raise ValueError(f"is missing columns: {missing}")
+
+    X = df[feature_cols].fillna(0.0)
+
+    # decision_function: higher = more normal. We invert so higher = more anomalous.
+    # Scored in batches so per-batch latency shows up in the metrics.
+    batch_hist = metrics.REGISTRY.histogram("ath_score_batch_seconds", "Wall time to score one batch of flows")
+    scores = np.empty(len(X))
+    for start in range(0, len(X), SCORE_BATCH_ROWS):
+        with batch_hist.time():
+            scores[start:start + SCORE_BATCH_ROWS] = model.decision_function(X.iloc[start:start + SCORE_BATCH_ROWS])
+    metrics.REGISTRY.counter("ath_score_flows_total", "Flows scored").inc(len(X))
+
+    df["anomaly_score"] = -scores
+    # IsolationForest.predict is just decision_function < 0; reuse the scores
+    # instead of walking the trees a second time
+    df["is_anomaly"] = (scores < 0).astype(int)
+
+    # sort: most suspicious first
+    return df.sort_values("anomaly_score", ascending=False)
+
+
+def load_model(model_path: Path):
+    """joblib.load the model, recording how long it took."""
+    import joblib  # loading the model pulls in sklearn too
+
+    start = time.perf_counter()
+    model = joblib.load(model_path)
+    metrics.REGISTRY.gauge("ath_model_load_seconds", "Wall time of the last model load").set(time.perf_counter() - start)
+    return model
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Score flows for anomalies")
     parser.add_argument("--csv", required=True, help="Input features CSV")
     parser.add_argument("--model", required=True, help="Trained model .pkl")
     parser.add_argument("--out", required=True, help="Output scored CSV")
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="Output SQLite flow store (default: --out with a .db suffix)",
+    )
+    parser.add_argument("--no-db", action="store_true", help="Skip writing the SQLite flow store")
     args = parser.parse_args()
 
     in_path = Path(args.csv)
@@ -33,32 +327,29 @@ def main() -> None:
     if not model_path.exists():
         raise SystemExit(f"[err] model file not found: {model_path}")
 
-    print(f"[ok] loading data from {in_path}")
-    df = pd.read_csv(in_path)
-
-    missing = [c for c in FEATURE_COLS if c not in df.columns]
-    if missing:
-        raise SystemExit(f"[err] CSV is missing columns: {missing}")
-
-    X = df[FEATURE_COLS].values
-
-    print(f"[ok] loading model from {model_path}")
-    model = joblib.load(model_path)
+    with metrics.job("score"):
+        print(f"[ok] loading data from {in_path}")
+        df = pd.read_csv(in_path)
 
-    # decision_function: higher = more normal. We invert so higher = more anomalous.
-    scores = model.decision_function(X)
-    preds = model.predict(X)  # 1 = normal, -1 = anomaly
+        print(f"[ok] loading model from {model_path}")
+        model = load_model(model_path)
 
-    df["anomaly_score"] = -scores
-    df["is_anomaly"] = (preds == -1).astype(int)
+        with metrics.stage("score"):
+            try:
+                df_sorted = score_flows(df, model)
+            except ValueError as e:
+                raise SystemExit(f"[err] CSV {e}")
 
-    # sort: most suspicious first
-    df_sorted = df.sort_values("anomaly_score", ascending=False)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        df_sorted.to_csv(out_path, index=False)
 
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    df_sorted.to_csv(out_path, index=False)
+        print(f"[ok] wrote scored flows to {out_path}")
 
-    print(f"[ok] wrote scored flows to {out_path}")
+        if not args.no_db:
+            db_path = Path(args.db) if args.db else out_path.with_suffix(".db")
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            write_flow_db(df_sorted, db_path)
+            print(f"[ok] wrote indexed flow store to {db_path}")
 
 
 if __name__ == "__main__":
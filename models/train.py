@@ -1,29 +1,50 @@
 #!/usr/bin/env python3
 """Train Isolation Forest on feature CSV."""
 import argparse
+import sys
 from pathlib import Path
 import pandas as pd
-from sklearn.ensemble import IsolationForest
-import joblib
+
+try:
+    import metrics
+except ImportError:  # run as a script: put the repo root on sys.path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    import metrics
+
+# Optional groups from extract.py (per-source, and per-direction with
+# --bidirectional); each is used when the CSV has it. Imported rather than
+# copied so a renamed column can't silently drop out of training.
+from feature_extractor.extract import BIDIR_FEATURES, HOST_FEATURES, WINDOW_FEATURES
 
 NUMERIC = ["pkt_count","bytes","duration_ms","avg_pkt_size","iat_mean_ms","iat_std_ms","payload_entropy","proto"]
 
+def train_model(df: pd.DataFrame):
+    from sklearn.ensemble import IsolationForest  # heavy; only needed to fit
+
+    cols = NUMERIC + [c for c in HOST_FEATURES + WINDOW_FEATURES + BIDIR_FEATURES if c in df.columns]
+    X = df[cols].fillna(0.0)
+
+    model = IsolationForest(contamination=0.1, random_state=42)
+    model.fit(X)
+    return model
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--csv", type=str, default="data/features.csv")
     ap.add_argument("--model", type=str, default="models/model.pkl")
     args = ap.parse_args()
 
-    df = pd.read_csv(args.csv)
-    X = df[NUMERIC].fillna(0.0)
+    import joblib
 
-    model = IsolationForest(contamination=0.1, random_state=42)
-    model.fit(X)
+    with metrics.job("train"):
+        df = pd.read_csv(args.csv)
+        with metrics.stage("train"):
+            model = train_model(df)
 
-    out = Path(args.model)
-    out.parent.mkdir(parents=True, exist_ok=True)
-    joblib.dump(model, out)
-    print(f"[ok] saved model to {out}")
+        out = Path(args.model)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(model, out)
+        print(f"[ok] saved model to {out}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Run extract -> train -> score in one process.
+
+The feature frame is handed between stages in memory, so heavy libraries are
+imported once and nothing is round-tripped through CSV. The model, scored.csv
+and scored.db are written as usual; features.csv and host_sketches.json only
+when asked for. Each stage prints its wall time and records it, with peak
+RSS, in data/metrics/pipeline.json for the dashboard's /metrics endpoint.
+
+  python pipeline.py --pcap data/live_capture.pcap --write-features data/features.csv
+  python pipeline.py --no-train          # score with the existing model
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import metrics
+from feature_extractor.extract import build_features
+from metrics import stage
+from models.score import load_model, score_flows, write_flow_db
+from models.train import train_model
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Extract, train and score in a single process")
+    ap.add_argument("--pcap", type=str, default="", help="Path to pcap/pcapng (default: demo rows)")
+    ap.add_argument("--window", type=int, default=60,
+                    help="Sliding window (seconds) for per-source behaviour features")
+    ap.add_argument("--bidirectional", action="store_true",
+                    help="One row per conversation (both directions) with forward/backward counters")
+    ap.add_argument("--model", type=str, default="models/model.pkl", help="Model .pkl to write (or read with --no-train)")
+    ap.add_argument("--no-train", action="store_true", help="Score with the existing --model instead of retraining")
+    ap.add_argument("--out", type=str, default="data/scored.csv", help="Output scored CSV")
+    ap.add_argument("--db", type=str, default=None, help="Output SQLite flow store (default: --out with a .db suffix)")
+    ap.add_argument("--no-db", action="store_true", help="Skip writing the SQLite flow store")
+    ap.add_argument("--write-features", type=str, default="", help="Also write the feature CSV here")
+    ap.add_argument("--write-sketches", type=str, default="", help="Also write the host sketch summary JSON here")
+    ap.add_argument("--profile", type=str, default="", help="Dump a cProfile of the run into this directory")
+    args = ap.parse_args()
+
+    if args.profile:
+        metrics.PROFILE_DIR = args.profile
+    started = time.perf_counter()
+    with metrics.job("pipeline"):
+        run(args)
+    print(f"[time] {'total':<8} {time.perf_counter() - started:8.3f}s")
+
+
+def run(args) -> None:
+    import joblib
+
+    model_path = Path(args.model)
+    out_path = Path(args.out)
+
+    with stage("extract"):
+        df, sketches = build_features(args.pcap or None, args.window, args.bidirectional)
+    print(f"[ok] extracted {len(df)} flows")
+
+    if args.write_features:
+        with stage("write-features"):
+            path = Path(args.write_features)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            df.to_csv(path, index=False)
+        print(f"[ok] wrote features to {path}")
+    if args.write_sketches:
+        path = Path(args.write_sketches)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(sketches.summary(), indent=2))
+        print(f"[ok] wrote host sketches to {path}")
+
+    if args.no_train:
+        if not model_path.exists():
+            raise SystemExit(f"[err] model file not found: {model_path}")
+        with stage("load"):
+            model = load_model(model_path)
+    else:
+        with stage("train"):
+            model = train_model(df)
+        model_path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(model, model_path)
+        print(f"[ok] saved model to {model_path}")
+
+    with stage("score"):
+        try:
+            scored = score_flows(df, model)
+        except ValueError as e:
+            raise SystemExit(f"[err] features {e}")
+
+    with stage("write"):
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        scored.to_csv(out_path, index=False)
+        if not args.no_db:
+            db_path = Path(args.db) if args.db else out_path.with_suffix(".db")
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            write_flow_db(scored, db_path)
+    print(f"[ok] wrote scored flows to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env bash
+# Run a collector and several sensor agents on one machine.
+# Usage: scripts/multi_sensor_demo.sh [N_SENSORS] [pcap ...]
+set -euo pipefail
+
+N="${1:-3}"
+shift || true
+SOCK="${TMPDIR:-/tmp}/ath-collector.sock"
+OUT="data/sensor_features.csv"
+
+python -m sensors.collector --listen "unix://$SOCK" --out "$OUT" --truncate --exit-after-sensors "$N" &
+COLLECTOR=$!
+
+for _ in $(seq 1 50); do
+  [ -S "$SOCK" ] && break
+  sleep 0.1
+done
+
+PCAP_ARGS=()
+for p in "$@"; do
+  PCAP_ARGS+=(--pcap "$p")
+done
+
+AGENTS=()
+for i in $(seq 1 "$N"); do
+  python -m sensors.agent --collector "unix://$SOCK" --sensor-id "sensor$i" "${PCAP_ARGS[@]+"${PCAP_ARGS[@]}"}" &
+  AGENTS+=($!)
+done
+
+# an agent that fails before connecting never counts toward --exit-after-sensors
+FAILED=0
+for pid in "${AGENTS[@]}"; do
+  wait "$pid" || FAILED=$((FAILED + 1))
+done
+if [ "$FAILED" -gt 0 ]; then
+  echo "[err] $FAILED of $N agents failed" >&2
+  kill "$COLLECTOR" 2>/dev/null || true
+  wait "$COLLECTOR" || true
+  exit 1
+fi
+
+wait "$COLLECTOR"
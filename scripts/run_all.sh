@@ -9,6 +9,5 @@ source .venv/bin/activate
 pip install --upgrade pip
 pip install -r requirements.txt
 
-python feature_extractor/extract.py
-python models/train.py --csv data/features.csv --model models/model.pkl
+python pipeline.py --write-features data/features.csv --write-sketches data/host_sketches.json
 python dashboard/app.py
\ No newline at end of file
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Central flow collector: accepts binary flow streams from many sensor agents
+(sensors/agent.py) and merges them into its feature store
+(data/sensor_features.csv, kept apart from the CSV extract.py writes).
+
+Each connection thread decodes FLOWS frames and hands them to a bounded queue.
+A single writer thread drains the queue in batches, adds the per-host sketch
+and sliding-window features (which only make sense over all sensors), and
+appends to the CSV. An existing store is only appended to if its header is
+exactly STORE_COLUMNS; --truncate starts a fresh one. When the writer falls
+behind, the queue fills, connection
+threads block before ACKing, and sensors stall on their in-flight limit:
+backpressure reaches the sensors without dropping flows.
+
+  python -m sensors.collector --listen unix:///tmp/ath.sock --truncate
+  python -m sensors.agent --collector unix:///tmp/ath.sock --sensor-id s1 &
+  python -m sensors.agent --collector unix:///tmp/ath.sock --sensor-id s2 &
+"""
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from feature_extractor.extract import HOST_FEATURES, WINDOW_FEATURES, add_host_features, add_window_features
+from feature_extractor.sketches import HostSketches
+from feature_extractor.windows import SlidingWindowAggregator
+from sensors.wire import (
+    BYE, FLOW_FIELDS, FLOWS, HELLO, WireError, decode_flows, decode_hello, encode_ack,
+    parse_address, read_frame,
+)
+
+# Every row the collector writes, in order.
+STORE_COLUMNS = ["src", "dst"] + FLOW_FIELDS + ["sensor"] + HOST_FEATURES + WINDOW_FEATURES
+
+
+def check_store(out: Path, truncate: bool) -> None:
+    """Raise ValueError unless `out` is missing, empty, or has STORE_COLUMNS as its header."""
+    if truncate or not out.exists() or out.stat().st_size == 0:
+        out.write_text("")
+        return
+    columns = list(pd.read_csv(out, nrows=0).columns)
+    if columns != STORE_COLUMNS:
+        raise ValueError(
+            f"{out} was not written by the collector (columns {columns}); "
+            "pass a different --out or --truncate"
+        )
+
+
+class FeatureStoreWriter(threading.Thread):
+    """Drains decoded flow batches and appends them to the feature CSV."""
+
+    def __init__(self, out: Path, batch: int, flush_interval: float,
+                 queue_size: int, window_s: int):
+        super().__init__(daemon=True)
+        self.out = out
+        self.sketch_out = out.with_suffix(".sketches.json")
+        self.batch = batch
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.sketches = HostSketches()
+        self.windows = SlidingWindowAggregator(window_s)
+        self.written = 0
+        self._stopping = threading.Event()
+
+    def run(self) -> None:
+        pending = []
+        deadline = time.monotonic() + self.flush_interval
+        while not (self._stopping.is_set() and self.queue.empty()):
+            try:
+                sensor_id, records = self.queue.get(timeout=0.2)
+                for r in records:
+                    r["sensor"] = sensor_id
+                pending.extend(records)
+            except queue.Empty:
+                pass
+            if pending and (len(pending) >= self.batch or time.monotonic() >= deadline):
+                self._flush(pending)
+                pending = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        if pending:
+            self._flush(pending)
+
+    def _flush(self, records: list) -> None:
+        df = pd.DataFrame.from_records(records).sort_values("ts_start", kind="stable")
+        df, _ = add_host_features(df, self.sketches)
+        df = add_window_features(df, agg=self.windows)
+
+        header = self.out.stat().st_size == 0  # check_store() created the file
+        df[STORE_COLUMNS].to_csv(self.out, mode="a", header=header, index=False)
+        self.written += len(df)
+
+        tmp = self.sketch_out.with_name(self.sketch_out.name + ".tmp")
+        tmp.write_text(json.dumps(self.sketches.summary(), indent=2))
+        os.replace(tmp, self.sketch_out)
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self.join()
+
+
+class SensorHandler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        server = self.server
+        sock = self.request
+        sensor_id = None
+        received = 0
+        try:
+            ftype, payload = read_frame(sock)
+            if ftype != HELLO:
+                raise WireError("first frame must be HELLO")
+            sensor_id = decode_hello(payload)
+            print(f"[ok] sensor {sensor_id} connected")
+            while True:
+                ftype, payload = read_frame(sock)
+                if ftype == BYE:
+                    break
+                if ftype != FLOWS:
+                    raise WireError(f"unexpected frame type {ftype}")
+                records = decode_flows(payload)
+                server.writer.queue.put((sensor_id, records))  # blocks when full
+                sock.sendall(encode_ack(len(records)))
+                received += len(records)
+            print(f"[ok] sensor {sensor_id} done ({received} flows)")
+        except (EOFError, WireError, OSError) as e:
+            print(f"[warn] sensor {sensor_id or '(no HELLO)'} connection dropped after {received} flows: {e}")
+        finally:
+            # a dropped sensor is finished too, or --exit-after-sensors never fires
+            if sensor_id is not None:
+                server.sensor_finished()
+
+
+class _CollectorMixin:
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def sensor_finished(self) -> None:
+        with self.done_lock:
+            self.sensors_done += 1
+            if self.exit_after and self.sensors_done >= self.exit_after:
+                threading.Thread(target=self.shutdown, daemon=True).start()
+
+
+class TCPCollector(_CollectorMixin, socketserver.ThreadingTCPServer):
+    pass
+
+
+class UnixCollector(_CollectorMixin, socketserver.ThreadingUnixStreamServer):
+    pass
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Merge flow streams from sensor agents")
+    ap.add_argument("--listen", default="tcp://127.0.0.1:9700",
+                    help="tcp://host:port or unix:///path.sock")
+    ap.add_argument("--out", default="data/sensor_features.csv", help="Feature store CSV (appended)")
+    ap.add_argument("--truncate", action="store_true", help="Empty the feature store before collecting")
+    ap.add_argument("--batch", type=int, default=5000, help="Flows per write to the store")
+    ap.add_argument("--flush-interval", type=float, default=2.0, help="Max seconds between writes")
+    ap.add_argument("--queue", type=int, default=64, help="Decoded frames buffered before backpressure")
+    ap.add_argument("--window", type=int, default=60, help="Sliding window (seconds) for per-source features")
+    ap.add_argument("--exit-after-sensors", type=int, default=0,
+                    help="Exit once this many sensors have finished or dropped (0 = run until interrupted)")
+    args = ap.parse_args()
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        check_store(out, args.truncate)
+    except ValueError as e:
+        raise SystemExit(f"[err] {e}")
+
+    family, sockaddr = parse_address(args.listen)
+    if family == socket.AF_UNIX:
+        if os.path.exists(sockaddr):
+            os.unlink(sockaddr)
+        server = UnixCollector(sockaddr, SensorHandler)
+    else:
+        server = TCPCollector(sockaddr, SensorHandler)
+
+    server.writer = FeatureStoreWriter(out, args.batch, args.flush_interval, args.queue, args.window)
+    server.done_lock = threading.Lock()
+    server.sensors_done = 0
+    server.exit_after = args.exit_after_sensors
+    server.writer.start()
+
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"[ok] collector listening on {args.listen}, writing to {out}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.writer.stop()
+        if family == socket.AF_UNIX and os.path.exists(sockaddr):
+            os.unlink(sockaddr)
+    print(f"[ok] wrote {server.writer.written} flows to {out}")
+
+
+if __name__ == "__main__":
+    main()
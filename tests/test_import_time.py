@@ -0,0 +1,30 @@
+"""
+Start-up regression test: every entry point in benchmarks/import_time.py
+must stay within its import-time budget and must not import its listed
+heavy packages at load time.
+
+  python -m pytest tests/test_import_time.py
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from benchmarks.import_time import BUDGETS, measure  # noqa: E402
+
+REPEAT = 3  # best of, like the benchmark's default
+
+
+@pytest.mark.parametrize("module, budget_ms, forbidden", BUDGETS, ids=[b[0] for b in BUDGETS])
+def test_import_budget(module, budget_ms, forbidden, tmp_path):
+    # tmp_path as cwd: dashboard.app creates data/ and models/ where it starts
+    runs = [measure(module, str(tmp_path)) for _ in range(REPEAT)]
+
+    loaded = sorted(set(forbidden) & runs[0][1])
+    assert not loaded, f"{module} imports {', '.join(loaded)} at load time"
+
+    best_ms = min(us for us, _ in runs) / 1000
+    assert best_ms <= budget_ms, f"{module} took {best_ms:.1f} ms to import (budget {budget_ms} ms)"
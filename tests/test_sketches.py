@@ -0,0 +1,122 @@
+"""
+Bounded-memory host sketches: Space-Saving's count/error guarantees,
+HyperLogLog accuracy, and HostSketches staying within k hosts.
+
+  python -m pytest tests/test_sketches.py
+"""
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from feature_extractor.sketches import HostSketches, HyperLogLog, SpaceSaving  # noqa: E402
+
+
+def zipf_stream(n, hosts, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(hosts)]
+    return rng.choices([f"10.0.{i // 256}.{i % 256}" for i in range(hosts)], weights, k=n)
+
+
+def test_space_saving_exact_below_k():
+    ss = SpaceSaving(k=8)
+    stream = ["a"] * 5 + ["b"] * 3 + ["c"]
+    for key in stream:
+        assert ss.add(key) is None
+    assert ss.top() == [("a", 5, 0), ("b", 3, 0), ("c", 1, 0)]
+
+
+def test_space_saving_bounds():
+    k = 32
+    stream = zipf_stream(20_000, hosts=500)
+    true = Counter(stream)
+    ss = SpaceSaving(k)
+    for key in stream:
+        ss.add(key)
+
+    assert len(ss.counts) == k
+    assert sum(c for _, c, _ in ss.top()) == len(stream)
+    for key, count, error in ss.top():
+        # never underestimates, and overestimates by at most `error`
+        assert count - error <= true[key] <= count
+    # any key with more than n/k occurrences is guaranteed to be tracked
+    for key, c in true.items():
+        if c > len(stream) / k:
+            assert key in ss.counts
+
+
+def test_space_saving_evicts_the_minimum():
+    ss = SpaceSaving(k=2)
+    ss.add("a", 5)
+    ss.add("b", 2)
+    assert ss.add("c") == "b"
+    assert ss.counts["c"] == [3, 2]
+
+
+def test_space_saving_heap_stays_bounded():
+    ss = SpaceSaving(k=4)
+    for i in range(10_000):
+        ss.add(i % 4)
+    assert len(ss._heap) <= 4 * ss.k + 64
+
+
+@pytest.mark.parametrize("n", [10, 1_000, 50_000])
+def test_hyperloglog_accuracy(n):
+    hll = HyperLogLog(p=10)
+    for i in range(n):
+        hll.add(f"host-{i}")
+        hll.add(f"host-{i}")  # duplicates don't count
+    # standard error is 1.04 / sqrt(2**p), about 3.3% at p=10
+    assert hll.estimate() == pytest.approx(n, rel=0.1)
+
+
+def test_hyperloglog_clear():
+    hll = HyperLogLog(p=6)
+    for i in range(100):
+        hll.add(i)
+    hll.clear()
+    assert hll.estimate() == 0
+
+
+def test_hyperloglog_precision_range():
+    with pytest.raises(ValueError):
+        HyperLogLog(p=3)
+    with pytest.raises(ValueError):
+        HyperLogLog(p=17)
+
+
+def test_host_sketches():
+    sk = HostSketches(k=16, p=8)
+    for src in zipf_stream(5_000, hosts=300, seed=1):
+        sk.add_flow(src, "192.168.1.1", 443)
+    # a scanner showing up late: once it holds a slot it keeps it
+    for i in range(40):
+        sk.add_flow("172.16.0.9", f"192.168.0.{i}", 1000 + i % 5)
+
+    assert len(sk.fanout) <= sk.k
+    assert set(sk.fanout) == set(sk.talkers.counts)
+
+    stats = sk.host_stats("172.16.0.9")
+    assert stats["flows"] >= 40
+    assert stats["distinct_dst"] == pytest.approx(40, rel=0.15)
+    assert stats["distinct_dport"] == pytest.approx(5, abs=1)
+    assert sk.host_stats("203.0.113.1") == {"flows": 0, "error": 0, "distinct_dst": 0.0, "distinct_dport": 0.0}
+
+    summary = sk.summary()
+    assert summary["flows_seen"] == 5_040
+    assert len(summary["hosts"]) == sk.k
+    assert summary["hosts"][0]["flows"] == max(c for c, _ in sk.talkers.counts.values())
+
+
+def test_host_sketches_newcomer_starts_fresh():
+    sk = HostSketches(k=1, p=6)
+    for i in range(50):
+        sk.add_flow("a", f"d{i}", i)
+    sk.add_flow("b", "x", 1)  # evicts "a" and reuses its registers
+    assert "a" not in sk.fanout
+    assert sk.host_stats("b")["distinct_dst"] == pytest.approx(1, abs=0.5)
@@ -0,0 +1,100 @@
+"""
+Sliding-window ring buffers: the incremental aggregates must match a
+brute-force recount of the last `window_s` seconds.
+
+  python -m pytest tests/test_windows.py
+"""
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from feature_extractor.windows import SlidingWindowAggregator  # noqa: E402
+
+
+def brute_force(history, src, sec, window_s):
+    recent = [h for h in history if h[0] == src and sec - window_s < h[1] <= sec]
+    flows = len(recent)
+    return {
+        "src_win_flow_rate": flows / window_s,
+        "src_win_byte_rate": sum(h[3] for h in recent) / window_s,
+        "src_win_distinct_dst": len({h[2] for h in recent}),
+        "src_win_failed_ratio": sum(h[4] for h in recent) / flows,
+    }
+
+
+def test_single_flow():
+    agg = SlidingWindowAggregator(window_s=10)
+    assert agg.add("a", 100.5, "x", 1000, failed=1) == {
+        "src_win_flow_rate": 0.1,
+        "src_win_byte_rate": 100.0,
+        "src_win_distinct_dst": 1,
+        "src_win_failed_ratio": 1.0,
+    }
+
+
+def test_slots_expire():
+    agg = SlidingWindowAggregator(window_s=5)
+    agg.add("a", 0, "x", 100)
+    agg.add("a", 2, "y", 100)
+    assert agg.add("a", 4, "x", 100)["src_win_distinct_dst"] == 2
+    # second 0 has left the window (1..5); "x" is still seen at second 4
+    feats = agg.add("a", 5, "z", 100)
+    assert feats["src_win_flow_rate"] == 3 / 5
+    assert feats["src_win_distinct_dst"] == 3
+    # only seconds 5..9 remain
+    feats = agg.add("a", 9, "z", 100)
+    assert feats["src_win_flow_rate"] == 2 / 5
+    assert feats["src_win_distinct_dst"] == 1
+
+
+def test_idle_for_whole_window():
+    agg = SlidingWindowAggregator(window_s=3)
+    for t in range(3):
+        agg.add("a", t, f"d{t}", 10, failed=1)
+    feats = agg.add("a", 100, "d9", 10)
+    assert feats["src_win_flow_rate"] == 1 / 3
+    assert feats["src_win_failed_ratio"] == 0.0
+
+
+def test_late_arrival_counts_in_newest_slot():
+    agg = SlidingWindowAggregator(window_s=4)
+    agg.add("a", 10, "x", 10)
+    feats = agg.add("a", 8, "y", 10)  # out of order, within the window
+    assert feats["src_win_flow_rate"] == 2 / 4
+    # it was booked under second 10, so it survives until second 14
+    assert agg.add("a", 13, "z", 10)["src_win_flow_rate"] == 3 / 4
+    assert agg.add("a", 14, "z", 10)["src_win_flow_rate"] == 2 / 4
+
+
+@pytest.mark.parametrize("window_s", [1, 7, 60])
+def test_matches_brute_force(window_s):
+    rng = random.Random(window_s)
+    agg = SlidingWindowAggregator(window_s)
+    history = []
+    t = 0.0
+    for _ in range(3_000):
+        t += rng.expovariate(5.0) if rng.random() < 0.97 else rng.uniform(0, 3 * window_s)
+        src = rng.choice("abcde")
+        flow = (src, int(t), rng.choice("uvwxyz"), rng.randint(40, 1500), int(rng.random() < 0.2))
+        history.append(flow)
+        got = agg.add(src, t, flow[2], flow[3], flow[4])
+        want = brute_force(history, src, int(t), window_s)
+        assert got == pytest.approx(want)
+
+
+def test_idle_hosts_are_swept():
+    agg = SlidingWindowAggregator(window_s=10)
+    for i in range(100):
+        agg.add(f"h{i}", 0, "x", 1)
+    agg.add("a", 25, "x", 1)
+    assert set(agg.hosts) == {"a"}
+
+
+def test_window_must_be_positive():
+    with pytest.raises(ValueError):
+        SlidingWindowAggregator(window_s=0)
@@ -0,0 +1,122 @@
+"""
+Sensor wire format: FLOWS round-trips for both address families, and the
+collector-side checks on frame size, magic and truncated payloads.
+
+  python -m pytest tests/test_wire.py
+"""
+import socket
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from sensors import wire  # noqa: E402
+
+
+def flow(src, dst, **overrides):
+    rec = {
+        "src": src, "dst": dst, "sport": 51000, "dport": 443, "proto": 6,
+        "handshake_failed": 0, "ts_start": 1700000000.25, "pkt_count": 12,
+        "bytes": 5_000_000_000, "duration_ms": 120.5, "avg_pkt_size": 416.75,
+        "iat_mean_ms": 10.25, "iat_std_ms": 2.5, "payload_entropy": 7.5,
+    }
+    rec.update(overrides)
+    return rec
+
+
+def payload_of(frame: bytes, ftype: int) -> bytes:
+    got_type, length = wire.HEADER.unpack_from(frame, 0)
+    assert got_type == ftype
+    assert length == len(frame) - wire.HEADER.size
+    return frame[wire.HEADER.size:]
+
+
+@pytest.mark.parametrize("src, dst", [
+    ("10.0.0.1", "192.168.1.20"),
+    ("2001:db8::1", "fe80::2"),
+], ids=["ipv4", "ipv6"])
+def test_flows_round_trip(src, dst):
+    records = [flow(src, dst), flow(dst, src, sport=443, dport=51000, handshake_failed=1)]
+    decoded = wire.decode_flows(payload_of(wire.encode_flows(records), wire.FLOWS))
+
+    assert len(decoded) == len(records)
+    for rec, got in zip(records, decoded):
+        assert set(got) == {"src", "dst", *wire.FLOW_FIELDS}
+        for field, value in rec.items():
+            # the float fields travel as f32
+            assert got[field] == pytest.approx(value, rel=1e-6), field
+
+
+def test_empty_flows_frame():
+    assert wire.decode_flows(payload_of(wire.encode_flows([]), wire.FLOWS)) == []
+
+
+def test_too_many_records_for_one_frame():
+    records = [flow("10.0.0.1", "10.0.0.2")] * (wire.MAX_RECORDS_PER_FRAME + 1)
+    with pytest.raises(wire.WireError):
+        wire.encode_flows(records)
+
+
+@pytest.mark.parametrize("cut", [1, 3, 10], ids=["count", "address", "fields"])
+def test_truncated_flows_payload(cut):
+    payload = payload_of(wire.encode_flows([flow("10.0.0.1", "10.0.0.2")]), wire.FLOWS)
+    with pytest.raises(wire.WireError):
+        wire.decode_flows(payload[:cut])
+
+
+def test_trailing_bytes_rejected():
+    payload = payload_of(wire.encode_flows([flow("10.0.0.1", "10.0.0.2")]), wire.FLOWS)
+    with pytest.raises(wire.WireError):
+        wire.decode_flows(payload + b"\0")
+
+
+def test_bad_address_family_rejected():
+    payload = bytearray(payload_of(wire.encode_flows([flow("10.0.0.1", "10.0.0.2")]), wire.FLOWS))
+    payload[wire.COUNT.size] = 5
+    with pytest.raises(wire.WireError):
+        wire.decode_flows(bytes(payload))
+
+
+def test_hello_round_trip():
+    assert wire.decode_hello(payload_of(wire.encode_hello("edge-ä1"), wire.HELLO)) == "edge-ä1"
+
+
+@pytest.mark.parametrize("payload", [
+    b"XXXX\x01sensor",
+    b"ATH",
+    b"ATHF\x02sensor",
+    b"ATHF\x01\xff\xfe",
+], ids=["bad-magic", "short", "version", "not-utf8"])
+def test_bad_hello_rejected(payload):
+    with pytest.raises(wire.WireError):
+        wire.decode_hello(payload)
+
+
+def test_read_frame():
+    a, b = socket.socketpair()
+    with a, b:
+        a.sendall(wire.encode_ack(42) + wire.encode_frame(wire.BYE))
+        ftype, payload = wire.read_frame(b)
+        assert ftype == wire.ACK
+        assert wire.ACK_STRUCT.unpack(payload) == (42,)
+        assert wire.read_frame(b) == (wire.BYE, b"")
+
+
+def test_read_frame_size_limit():
+    a, b = socket.socketpair()
+    with a, b:
+        a.sendall(wire.HEADER.pack(wire.FLOWS, wire.MAX_FRAME_BYTES + 1))
+        with pytest.raises(wire.WireError):
+            wire.read_frame(b)
+
+
+def test_read_frame_closed_mid_frame():
+    a, b = socket.socketpair()
+    with b:
+        a.sendall(wire.HEADER.pack(wire.FLOWS, 10) + b"abc")
+        a.close()
+        with pytest.raises(EOFError):
+            wire.read_frame(b)